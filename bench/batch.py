@@ -0,0 +1,72 @@
+"""
+Scaling benchmark for namebatch
+
+Times formatting of a synthetic corpus with namebatch.format_names()
+on 1 to N worker processes, against a serial loop that creates a
+PersonalName for every name.
+
+Usage: python -m bench.batch [-n COUNT] [-j MAX_WORKERS] [-c CHUNK_SIZE]
+
+"""
+# Copyright 2023 by Moses Chong
+#
+# This program is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# This module uses spaces, not tabs
+
+from argparse import ArgumentParser
+from os import cpu_count
+from time import perf_counter
+from bench.corpus import make_names
+from namebatch import CHUNK_SIZE, format_names
+from personalname import PersonalName
+
+FMT = '{NS}, {N1} {NM}'
+
+def serial(records):
+    return [PersonalName(n, c).get_formatted_name(FMT) for n, c in records]
+
+def report(label, dt, count, t_serial=None):
+    line = "{:<22}{:>10.3f} s{:>12.0f} names/s".format(label, dt, count / dt)
+    if t_serial: line = "{}{:>8.2f}x".format(line, t_serial / dt)
+    print(line)
+
+def main(argv=None):
+    ap = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('-n', '--count', type=int, default=200000)
+    ap.add_argument('-j', '--max-workers', type=int, default=cpu_count())
+    ap.add_argument('-c', '--chunk-size', type=int, default=CHUNK_SIZE)
+    args = ap.parse_args(argv)
+    records = make_names(args.count)
+    t = perf_counter()
+    expected = serial(records)
+    t_serial = perf_counter() - t
+    report('serial PersonalName', t_serial, args.count)
+    # double the workers each time, up to and including max_workers
+    counts = []
+    j = 1
+    while j < args.max_workers:
+        counts.append(j)
+        j *= 2
+    counts.append(args.max_workers)
+    for j in counts:
+        t = perf_counter()
+        out = list(format_names(records, FMT, j, args.chunk_size))
+        dt = perf_counter() - t
+        assert out == expected
+        report('format_names, j={}'.format(j), dt, args.count, t_serial)
+
+if __name__ == '__main__':
+    main()
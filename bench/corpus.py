@@ -0,0 +1,60 @@
+"""
+Synthetic name corpora for PersonalName benchmarks
+
+"""
+# Copyright 2023 by Moses Chong
+#
+# This program is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# This module uses spaces, not tabs
+
+from random import Random
+
+WORDS = {
+    'latin': (
+        'Victor', 'Chang', 'Andre', 'Geim', 'Maria', 'Abu_Bakr', 'ibn',
+        'Enrique', 'Miguel', 'Iglesias', 'Preysler', 'Gauri', 'Nanda',
+    ),
+    'cjk': ('張', '任謙', '井上', '大輔', '葛飾', '北斎', '이', '도'),
+    'cyrillic': ('Андрей', 'Константинович', 'Гейм', 'Мария', 'Викторовна'),
+}
+ALT_NAMES = ('vchang', 'Goat Man', 'thegoat1', 'clocky', 'big.wav')
+ELEMENT_TYPES = ('N1', 'NM', 'NS', 'OA')
+
+def make_names(n, elements=3, alt_names=1, script='latin', seed=0):
+    """
+    Return a list of n (name_str, config_str) pairs, each with the
+    given number of main name elements and alternate names, with
+    elements drawn from the word list named by script.
+
+    The first elements are typed in the order of ELEMENT_TYPES, and
+    the first alternate name is assigned to the network example.com.
+
+    """
+    rng = Random(seed)
+    words = WORDS[script]
+    config = ';'.join(
+        '{}={}'.format(k, i+1) for i, k in enumerate(ELEMENT_TYPES[:elements])
+    )
+    if alt_names:
+        config = ';'.join((config, 'NN:example.com=1')).lstrip(';')
+    out = []
+    for x in range(n):
+        name = ' '.join(rng.choice(words) for y in range(elements))
+        if alt_names:
+            alts = ', '.join(rng.choice(ALT_NAMES) for y in range(alt_names))
+            name = '{} ({})'.format(name, alts)
+        out.append((name, config))
+    return out
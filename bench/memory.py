@@ -0,0 +1,100 @@
+"""
+Memory benchmark for PersonalName
+
+Compares the memory used per PersonalName against the attribute
+layout used before names were slotted and configurations shared
+(a per-instance __dict__, a full config dict and two translate
+tables per name).
+
+Usage: python -m bench.memory [-n COUNT]
+
+"""
+# Copyright 2023 by Moses Chong
+#
+# This program is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# This module uses spaces, not tabs
+
+import gc
+import tracemalloc
+from argparse import ArgumentParser
+from bench.corpus import make_names
+from personalname import PersonalName, get_config
+
+class LegacyName:
+    """
+    Stand-in with the per-instance attributes of the original
+    PersonalName, for comparison only.
+
+    """
+    def __init__(self, name_str, config_str=''):
+        self.name_string = name_str
+        self._config = dict(get_config(config_str))
+        self._tdict = {ord(self._config['MNSU']): self._config['MNSP']}
+        self._tdict_in = {ord(self._config['MNSP']): self._config['MNSU']}
+        self._i_alt_list_start = len(name_str)
+        self._i_alt_list_end = self._i_alt_list_start
+        if self._config['ALST'] in name_str:
+            self._i_alt_list_start = name_str.index(self._config['ALST'])
+            self._i_alt_list_end = name_str.index(
+                self._config['ALED'], self._i_alt_list_start
+            )
+
+def bytes_per_instance(cls, records, touch=False):
+    """
+    Return the average number of bytes allocated per object when
+    creating an object of class cls for every (name_str, config_str)
+    in records. Name strings and shared configurations are created
+    beforehand and not counted.
+
+    If touch is True, the element and alternate name counts are also
+    read from each PersonalName, to include lazily derived state.
+
+    """
+    for n, c in records: get_config(c)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        objs = [None] * len(records)
+        base = tracemalloc.get_traced_memory()[0] - before
+        for i, (n, c) in enumerate(records):
+            objs[i] = cls(n, c)
+        if touch:
+            for x in objs:
+                x.count_main_name_elements()
+                x.count_alt_names()
+        used = tracemalloc.get_traced_memory()[0] - before - base
+    finally:
+        tracemalloc.stop()
+    return used / len(records)
+
+def main(argv=None):
+    ap = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('-n', '--count', type=int, default=100000)
+    args = ap.parse_args(argv)
+    records = make_names(args.count)
+    results = (
+        ('legacy layout', bytes_per_instance(LegacyName, records)),
+        ('PersonalName', bytes_per_instance(PersonalName, records)),
+        ('PersonalName, offsets read', bytes_per_instance(
+            PersonalName, records, touch=True
+        )),
+    )
+    for label, b in results:
+        print("{:<28}{:>10.1f} bytes/name".format(label, b))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""
+Benchmark suite for the PNTK standard methods
+
+Times every standard PersonalName method over synthetic corpora of
+varying main name element count, alternate name count and script,
+and writes the results as JSON, so that results from different
+commits can be compared.
+
+Usage:
+python -m bench.methods [-n COUNT] [-r REPEAT] [-o RESULTS.json]
+python -m bench.methods --compare OLD_RESULTS.json [-t THRESHOLD]
+
+"""
+# Copyright 2023 by Moses Chong
+#
+# This program is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# This module uses spaces, not tabs
+
+import json
+import platform
+import subprocess
+import sys
+from argparse import ArgumentParser
+from itertools import product
+from time import perf_counter_ns, strftime
+from bench.corpus import WORDS, make_names
+from personalname import PersonalName
+
+CORPORA = { # corpus parameters and their values, all combinations are used
+    'elements': (1, 3, 6),
+    'alt_names': (0, 1, 4),
+    'script': tuple(WORDS),
+}
+FMT = '{NS}, {N1} {NM}'
+
+# Standard methods, as (label, function, needs alternate names).
+# Each function is called once per name with a new PersonalName and
+# the corpus record (name_str, config_str).
+METHODS = (
+    ('__init__', lambda p, r: PersonalName(*r), False),
+    ('parse_config', lambda p, r: PersonalName.parse_config(r[1]), False),
+    ('get_config_str', lambda p, r: p.get_config_str(), False),
+    ('count_alt_names', lambda p, r: p.count_alt_names(), False),
+    ('count_main_name_elements',
+        lambda p, r: p.count_main_name_elements(), False),
+    ('get_alt_name[1]', lambda p, r: p.get_alt_name(1), True),
+    ('get_alt_name[network]',
+        lambda p, r: p.get_alt_name('example.com'), True),
+    ('get_formatted_name', lambda p, r: p.get_formatted_name(FMT), False),
+    ('get_main_name', lambda p, r: p.get_main_name(), False),
+    ('get_main_name_element[type]',
+        lambda p, r: p.get_main_name_element('NS'), False),
+    ('get_main_name_element[1]',
+        lambda p, r: p.get_main_name_element(1), False),
+    ('get_main_name_element[-1]',
+        lambda p, r: p.get_main_name_element(-1), False),
+    ('get_main_name_element_type',
+        lambda p, r: p.get_main_name_element_type(r[0].split()[0]), False),
+    ('get_main_name_elements_as_str',
+        lambda p, r: p.get_main_name_elements_as_str(2, -1), False),
+    ('get_main_name_nosp', lambda p, r: p.get_main_name_nosp(), False),
+)
+
+def _commit():
+    try:
+        out = subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def time_method(fn, records, repeat):
+    """
+    Return the best average time in nanoseconds of calling fn once
+    for every record, out of repeat runs. New PersonalName objects
+    are made for every run, outside of the timing.
+
+    """
+    best = None
+    for x in range(repeat):
+        names = [PersonalName(*r) for r in records]
+        t = perf_counter_ns()
+        for p, r in zip(names, records): fn(p, r)
+        dt = (perf_counter_ns() - t) / len(records)
+        if best is None or dt < best: best = dt
+    return best
+
+def run(count, repeat, methods=None):
+    """
+    Run the benchmarks, returning the results as a dict
+    """
+    results = []
+    keys = tuple(CORPORA)
+    for values in product(*(CORPORA[k] for k in keys)):
+        corpus = dict(zip(keys, values))
+        records = make_names(count, **corpus)
+        for label, fn, needs_alts in METHODS:
+            if methods and label not in methods: continue
+            if needs_alts and not corpus['alt_names']: continue
+            results.append({
+                'method': label,
+                'corpus': corpus,
+                'ns_per_call': round(time_method(fn, records, repeat), 1),
+            })
+    return {
+        'meta': {
+            'commit': _commit(),
+            'count': count,
+            'date': strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+def _key(result):
+    c = result['corpus']
+    return (result['method'],) + tuple(c[k] for k in sorted(c))
+
+def compare(old, new, threshold):
+    """
+    Print new results against old results, and return a list of the
+    keys of results that are slower by more than threshold (0.1 for
+    10%).
+
+    """
+    old_times = {_key(x): x['ns_per_call'] for x in old['results']}
+    regressions = []
+    for x in new['results']:
+        k = _key(x)
+        if k not in old_times: continue
+        ratio = x['ns_per_call'] / old_times[k]
+        flag = ''
+        if ratio > 1 + threshold:
+            regressions.append(k)
+            flag = ' SLOWER'
+        print("{:<32}{:<20}{:>10.1f}{:>10.1f}{:>8.2f}x{}".format(
+            k[0], ','.join(str(y) for y in k[1:]), old_times[k],
+            x['ns_per_call'], ratio, flag
+        ))
+    return regressions
+
+def main(argv=None):
+    ap = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('-n', '--count', type=int, default=1000,
+        help='names per corpus')
+    ap.add_argument('-r', '--repeat', type=int, default=5)
+    ap.add_argument('-m', '--method', action='append',
+        help='only run this method, may be repeated')
+    ap.add_argument('-o', '--output', help='write results to this file')
+    ap.add_argument('-c', '--compare', help='compare with earlier results')
+    ap.add_argument('-t', '--threshold', type=float, default=0.1,
+        help='flag results slower by this fraction (default: 0.1)')
+    args = ap.parse_args(argv)
+    results = run(args.count, args.repeat, args.method)
+    if args.output:
+        with open(args.output, mode='w') as h:
+            json.dump(results, h, indent=1)
+    if args.compare:
+        with open(args.compare) as h:
+            old = json.load(h)
+        if compare(old, results, args.threshold): sys.exit(1)
+    elif not args.output:
+        json.dump(results, sys.stdout, indent=1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Asynchronous Bulk Name Processing for Python
+
+asyncio-friendly formatting and element extraction for large numbers
+of names, for use with the Personal Name Toolkit reference
+implementation
+
+"""
+# Copyright 2023 by Moses Chong
+#
+# This program is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# This module uses spaces, not tabs
+
+import asyncio
+from itertools import islice
+from namebatch import _run_table
+
+SLICE_SIZE = 500      # default number of names per slice
+OFFLOAD_SIZE = 500    # slices of at least this many names use the executor
+
+async def _slices(source, slice_size):
+    # Read source in slices, only reading the next slice when asked
+    if hasattr(source, '__aiter__'):
+        chunk = []
+        async for x in source:
+            chunk.append(x)
+            if len(chunk) >= slice_size:
+                yield chunk
+                chunk = []
+        if chunk: yield chunk
+    else:
+        it = iter(source)
+        chunk = list(islice(it, slice_size))
+        while chunk:
+            yield chunk
+            chunk = list(islice(it, slice_size))
+
+def _run_slice(task, arg, records):
+    names, configs = zip(*records)
+    return _run_table(task, arg, names, configs)
+
+async def _amap(source, task, arg, slice_size, offload_size, executor):
+    loop = asyncio.get_running_loop()
+    async for chunk in _slices(source, slice_size):
+        if len(chunk) >= offload_size:
+            out = await loop.run_in_executor(
+                executor, _run_slice, task, arg, chunk
+            )
+        else:
+            out = _run_slice(task, arg, chunk)
+        for x in out:
+            yield x
+        await asyncio.sleep(0)  # let other tasks run between slices
+
+def aformat_names(
+    source, fmt, slice_size=SLICE_SIZE, offload_size=OFFLOAD_SIZE,
+    executor=None
+):
+    """
+    Asynchronously yield each name from source, an iterable or
+    asynchronous iterable of (name_str, config_str) pairs, formatted
+    according to the format string fmt. Please see
+    PersonalName.get_formatted_name() for the format code.
+
+    Example:
+    async for x in aformat_names(records, '{NS}, {N1}'):
+        await send(x)
+
+    Names are processed in slices of up to slice_size names, and
+    control is returned to the event loop after every slice. Slices
+    of at least offload_size names are processed on executor (the
+    event loop's default executor if not specified), so that large
+    requests do not block the event loop. Executors may be thread
+    or process pools.
+
+    The next slice is only read from source after all names of the
+    current slice have been consumed, so a slow consumer holds back
+    the reading of source.
+
+    """
+    return _amap(source, 'format', fmt, slice_size, offload_size, executor)
+
+def aextract_elements(
+    source, types, slice_size=SLICE_SIZE, offload_size=OFFLOAD_SIZE,
+    executor=None
+):
+    """
+    Asynchronously yield a tuple of main name elements for each name
+    from source, with one element for each type or numerical index
+    in types.
+
+    Please see aformat_names() for details on the other arguments.
+
+    """
+    return _amap(
+        source, 'elements', tuple(types), slice_size, offload_size, executor
+    )
@@ -0,0 +1,155 @@
+"""
+Multi-Process Batch Name Processing for Python
+
+Formatting and element extraction for large numbers of names on a
+pool of worker processes, for use with the Personal Name Toolkit
+reference implementation
+
+"""
+# Copyright 2023 by Moses Chong
+#
+# This program is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# This module uses spaces, not tabs
+
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from os import cpu_count
+from nametable import NameTable
+from personalname import PersonalName, compile_format
+
+CHUNK_SIZE = 5000    # default number of names per chunk
+MAX_PENDING = 2      # chunks in progress per worker
+
+def _encode_chunks(records, chunk_size):
+    # Split (name_str, config_str) pairs into chunks of names, the
+    # distinct config strings in the chunk, and an index into the
+    # config strings for each name, so that each config string is
+    # sent once per chunk instead of once per name.
+    it = iter(records)
+    chunk = list(islice(it, chunk_size))
+    while chunk:
+        config_ids = {}
+        ids = array('I')
+        names = []
+        for n, c in chunk:
+            names.append(n)
+            ids.append(config_ids.setdefault(c, len(config_ids)))
+        yield names, tuple(config_ids), ids
+        chunk = list(islice(it, chunk_size))
+
+def _run_table(task, arg, names, configs):
+    # Run a task over names and their config strings as a NameTable,
+    # also used by nameasync
+    t = NameTable(names, configs)
+    if task == 'format':
+        return t.get_formatted_name(arg)
+    elif task == 'elements':
+        return list(zip(*(t.get_main_name_element(k) for k in arg)))
+    raise ValueError('unsupported task {}'.format(task))
+
+def _run_name(task, arg, name_str, config_str):
+    # Run a task on a single name as a PersonalName, returning the
+    # exception raised instead of the result if the name is bad
+    try:
+        name = PersonalName(name_str, config_str)
+        if task == 'format':
+            return compile_format(arg).apply(name)
+        elif task == 'elements':
+            return tuple(name.get_main_name_element(k) for k in arg)
+    except Exception as x:
+        return x
+    raise ValueError('unsupported task {}'.format(task))
+
+def _run_chunk(task, arg, names, configs, ids, catch=False):
+    # Runs on a worker. Configurations are parsed once per worker,
+    # see personalname.get_config(). When catch is True, a chunk that
+    # fails is run again one name at a time, so that only the bad
+    # names fail, exactly as they would one PersonalName at a time.
+    configs = [configs[i] for i in ids]
+    try:
+        return _run_table(task, arg, names, configs)
+    except Exception:
+        if not catch: raise
+    return [_run_name(task, arg, n, c) for n, c in zip(names, configs)]
+
+def _map_chunks(records, task, arg, workers, chunk_size, catch=False):
+    if workers is None: workers = cpu_count() or 1
+    chunks = _encode_chunks(records, chunk_size)
+    if workers < 2:
+        for chunk in chunks:
+            yield from _run_chunk(task, arg, *chunk, catch)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(ex.submit(_run_chunk, task, arg, *chunk, catch))
+            if len(pending) >= workers * MAX_PENDING:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+def format_names(
+    records, fmt, workers=None, chunk_size=CHUNK_SIZE, catch=False
+):
+    """
+    Yield each name from records, an iterable of (name_str,
+    config_str) pairs, formatted according to the format string fmt.
+    Please see PersonalName.get_formatted_name() for the format code.
+
+    Example:
+    list(format_names(
+        [('Victor Chang', 'N1=1;NS=2'), ('Inoue Daisuke', 'NS=1;N1=2')],
+        '{NS}, {N1}'
+    )) => ['Chang, Victor', 'Inoue, Daisuke']
+
+    Names are sent to a pool of worker processes in chunks of up to
+    chunk_size names. Output is in the same order as the input.
+    workers is the number of worker processes, which defaults to the
+    number of CPUs; when workers is 1, all names are processed in the
+    calling process.
+
+    At most MAX_PENDING chunks per worker are read ahead of the output,
+    so records may be an iterable of any length.
+
+    Bad names, such as those with an alternate name list that is not
+    closed, raise an exception. When catch is True, the exception for
+    each bad name is yielded in its place instead, and all other names
+    are processed.
+
+    """
+    return _map_chunks(records, 'format', fmt, workers, chunk_size, catch)
+
+def extract_elements(
+    records, types, workers=None, chunk_size=CHUNK_SIZE, catch=False
+):
+    """
+    Yield a tuple of main name elements for each name from records,
+    an iterable of (name_str, config_str) pairs, with one element for
+    each type or numerical index in types.
+
+    Example:
+    list(extract_elements([('Inoue Daisuke', 'NS=1;N1=2')], ('N1', 'NS')))
+        => [('Daisuke', 'Inoue')]
+
+    Please see format_names() for details on workers, chunk_size and
+    catch.
+
+    """
+    return _map_chunks(
+        records, 'elements', tuple(types), workers, chunk_size, catch
+    )
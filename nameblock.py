@@ -0,0 +1,152 @@
+"""
+Blocking Keys for Personal Names in Python
+
+Grouping of name records into buckets of likely duplicates by keys
+made from main name elements, for use with the Personal Name Toolkit
+reference implementation
+
+"""
+# Copyright 2023 by Moses Chong
+#
+# This program is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# This module uses spaces, not tabs
+
+import pickle
+from itertools import combinations
+from os import path
+from tempfile import TemporaryDirectory
+from unicodedata import normalize
+from personalname import PersonalName
+
+SURNAME_INITIAL = ('NS', 'N1:1')  # surname and first initial
+SURNAME_FIRST_NAME = ('NS', 'N1') # surname and first name
+MAX_RECORDS = 100000              # default max records held in memory
+PARTITIONS = 64                   # default number of spill files
+PART_LEN_SEP = '\u003a'           # : colon, as in 'N1:1'
+
+def make_key(parts=SURNAME_INITIAL, fold=True):
+    """
+    Return a function that makes a blocking key from a PersonalName.
+
+    Example:
+    k = make_key(('NS', 'N1:1'))
+    k(PersonalName('Inoue Daisuke', 'NS=1;N1=2')) => ('inoue', 'd')
+    k(PersonalName('Daisuke INOUE', 'N1=1;NS=2')) => ('inoue', 'd')
+
+    parts are main name element types, each optionally followed by a
+    colon and a length to only use the first characters of the
+    element (e.g. 'N1:1' for the first initial). Elements are used
+    in presentation-ready form. If fold is True, elements are
+    NFKC-normalised and casefolded.
+
+    The key is a tuple with one item for each part. Names without any
+    of the elements get a key of None.
+
+    """
+    spec = []
+    for p in parts:
+        t, sep, n = p.partition(PART_LEN_SEP)
+        if t not in PersonalName.INDEXES_MAIN_NAME:
+            raise KeyError('unsupported element {}'.format(t))
+        spec.append((t, int(n) if sep else None))
+    spec = tuple(spec)
+    def key(name):
+        out = []
+        for t, n in spec:
+            v = name.get_main_name_element(t)
+            if fold: v = normalize('NFKC', v).casefold()
+            out.append(v[:n])
+        return tuple(out) if any(out) else None
+    return key
+
+def _spill(buckets, paths):
+    # append buffered records to partition files by key hash
+    parts = {}
+    for k, records in buckets.items():
+        parts.setdefault(hash(k) % len(paths), []).append((k, records))
+    for i, items in parts.items():
+        with open(paths[i], mode='ab') as h:
+            pickle.dump(items, h, pickle.HIGHEST_PROTOCOL)
+
+def _read_partition(p):
+    buckets = {}
+    if not path.exists(p): return buckets
+    with open(p, mode='rb') as h:
+        while True:
+            try:
+                items = pickle.load(h)
+            except EOFError:
+                break
+            for k, records in items:
+                buckets.setdefault(k, []).extend(records)
+    return buckets
+
+def block_records(
+    records, key=None, min_size=2, max_records=MAX_RECORDS,
+    partitions=PARTITIONS
+):
+    """
+    Group records into buckets of records with the same blocking key,
+    and yield each bucket as a (key, list of records) pair.
+
+    Example:
+    for k, bucket in block_records(records, make_key(SURNAME_INITIAL)):
+        for a, b in candidate_pairs(bucket):
+            compare(a, b)
+
+    Records are tuples of (name_str, config_str, ...); any further
+    items, such as record ids, are kept as-is. key is a function that
+    makes a blocking key from a PersonalName, see make_key(); the
+    default is surname and first initial. Records with a key of None
+    are skipped, as are buckets with fewer than min_size records.
+
+    Records are read in a single pass. When more than max_records
+    records are held in memory, they are moved to one of partitions
+    temporary files by key, and each file is grouped separately once
+    all records are read. For inputs larger than memory, partitions
+    should be at least the number of records divided by max_records.
+
+    """
+    if key is None: key = make_key()
+    buckets = {}
+    held = 0
+    with TemporaryDirectory() as tmp:
+        paths = [path.join(tmp, str(i)) for i in range(partitions)]
+        spilled = False
+        for r in records:
+            k = key(PersonalName(r[0], r[1]))
+            if k is None: continue
+            buckets.setdefault(k, []).append(r)
+            held += 1
+            if held >= max_records:
+                _spill(buckets, paths)
+                buckets = {}
+                held = 0
+                spilled = True
+        if spilled:
+            _spill(buckets, paths)
+            for p in paths:
+                for k, bucket in _read_partition(p).items():
+                    if len(bucket) >= min_size: yield k, bucket
+        else:
+            for k, bucket in buckets.items():
+                if len(bucket) >= min_size: yield k, bucket
+
+def candidate_pairs(bucket):
+    """
+    Yield every pair of records in a bucket, for comparison
+    """
+    return combinations(bucket, 2)
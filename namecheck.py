@@ -0,0 +1,213 @@
+"""
+Name Checking for Python
+
+Validation of names and configuration strings in bulk, with per-row
+diagnostics, for use with the Personal Name Toolkit reference
+implementation
+
+"""
+# Copyright 2023 by Moses Chong
+#
+# This program is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# This module uses spaces, not tabs
+
+from collections import namedtuple
+from functools import lru_cache
+from hashlib import blake2b
+from personalname import CONFIG_CACHE_SIZE, PersonalName
+
+# diagnostic codes
+BAD_OPTION = 'bad-option'          # option is not a key=value pair
+DUPLICATE_KEY = 'duplicate-key'    # option set more than once
+ALIAS_DEPTH = 'alias-depth'        # alias of an alias, or circular alias
+NOT_INTEGER = 'not-integer'        # index does not resolve to an integer
+BAD_DELIMITER = 'bad-delimiter'    # delimiter empty, aliased or too long
+INDEX_RANGE = 'index-range'        # index past the last element or alt name
+ALT_LIST_OPEN = 'alt-list-open'    # ALST without a following ALED
+ALT_LIST_CLOSE = 'alt-list-close'  # ALED without a preceding ALST
+
+NAME_FIELD = 'name_str'
+CONFIG_FIELD = 'config_str'
+
+# row is the row number of the record, code is one of the diagnostic
+# codes above, and field is the configuration key, NAME_FIELD or
+# CONFIG_FIELD where the problem was found
+Diagnostic = namedtuple('Diagnostic', ('row', 'code', 'field', 'message'))
+
+def fingerprint(name_str, config_str):
+    """
+    Return a fingerprint of a name and configuration string, as a
+    bytes object. The same strings always have the same fingerprint,
+    so fingerprints of clean records may be kept between runs.
+
+    """
+    h = blake2b(digest_size=16)
+    h.update(config_str.encode('utf-8', 'surrogatepass'))
+    h.update(b'\0')
+    h.update(name_str.encode('utf-8', 'surrogatepass'))
+    return h.digest()
+
+@lru_cache(maxsize=CONFIG_CACHE_SIZE)
+def _check_config(config_str):
+    # Return problems with config_str as a tuple of (code, field,
+    # message), followed by the delimiters and the highest main name
+    # and nickname indexes, as needed for checking the name.
+    pn = PersonalName
+    out = []
+    opts = {}
+    for opt in config_str.split(pn.CONFIG_SEP) if config_str else ():
+        kv = opt.split(pn.CONFIG_KV_SEP)
+        if len(kv) != 2:
+            out.append((BAD_OPTION, CONFIG_FIELD, 'bad option {}'.format(opt)))
+            continue
+        k, v = kv
+        if k in opts:
+            out.append((DUPLICATE_KEY, k, 'option {} already set'.format(k)))
+            continue
+        opts[k] = v
+    delims = {}
+    for k, default in pn.CONFIG_DEFAULT.items():
+        v = opts.get(k, default)
+        if v in opts and v != k:
+            out.append((BAD_DELIMITER, k, 'delimiter {} is an alias'.format(k)))
+            v = default
+        elif not v or (k in ('MNSP', 'MNSU') and len(v) != 1):
+            out.append(
+                (BAD_DELIMITER, k, 'delimiter {} must be one character'.format(k))
+            )
+            v = default
+        delims[k] = v
+    max_main = (None, 0)  # (key, index)
+    max_nick = (None, 0)
+    for k, v in opts.items():
+        is_main = k in pn.INDEXES_MAIN_NAME
+        if not (is_main or k.startswith(pn.NICKNAME_PREFIX)): continue
+        if v in opts and v != k:
+            if opts[v] in opts:
+                out.append((ALIAS_DEPTH, k, 'alias {} of {} is an alias'.format(v, k)))
+                continue
+            v = opts[v]
+        try:
+            i = int(v)
+        except ValueError:
+            out.append((NOT_INTEGER, k, 'index {} must be integer'.format(k)))
+            continue
+        if i < 1:
+            out.append((INDEX_RANGE, k, 'index {} must be 1 or more'.format(k)))
+        elif is_main and i > max_main[1]: max_main = (k, i)
+        elif not is_main and i > max_nick[1]: max_nick = (k, i)
+    return tuple(out), delims, max_main, max_nick
+
+def check_row(name_str, config_str, row=None):
+    """
+    Return a list of Diagnostic for problems found with a name and
+    configuration string, or an empty list if there are none.
+
+    Example:
+    check_row('Victor Chang (vchang', 'N1=1;NS=2;NM=3', 0) => [
+        Diagnostic(0, 'alt-list-open', 'name_str', ...),
+        Diagnostic(0, 'index-range', 'NM', ...),
+    ]
+
+    Configuration strings are checked for the problems that would
+    make PersonalName raise exceptions: malformed options, keys set
+    more than once, more than one level of aliasing and indexes that
+    are not integers. Names are checked for alternate name lists that
+    are not opened or closed, and for element or alternate name
+    indexes past the end of the name. The results of checking each
+    configuration string are cached.
+
+    """
+    problems, delims, max_main, max_nick = _check_config(config_str)
+    out = [Diagnostic(row, *x) for x in problems]
+    n = len(name_str)
+    s = e = n
+    if delims['ALST'] in name_str:
+        s = name_str.find(delims['ALST'])
+        e = name_str.find(delims['ALED'], s)
+        if e < 0:
+            out.append(Diagnostic(
+                row, ALT_LIST_OPEN, NAME_FIELD, 'alternate name list not closed'
+            ))
+            e = n
+    elif delims['ALED'] in name_str:
+        out.append(Diagnostic(
+            row, ALT_LIST_CLOSE, NAME_FIELD, 'alternate name list not opened'
+        ))
+    k, i = max_main
+    if k and i > len(name_str[:s].split()):
+        out.append(Diagnostic(
+            row, INDEX_RANGE, k, 'index {} past last element'.format(k)
+        ))
+    k, i = max_nick
+    if k:
+        alts = name_str[s+1:e].split(delims['ALSE']) if s < n else ()
+        if i > sum(1 for x in alts if x.strip()):
+            out.append(Diagnostic(
+                row, INDEX_RANGE, k, 'index {} past last alternate name'.format(k)
+            ))
+    return out
+
+
+class NameChecker:
+    """
+    A checker for (name_str, config_str) records in bulk, which
+    remembers the records found to be clean.
+
+    Example:
+    c = NameChecker()
+    for d in c.check(records):
+        log(d.row, d.code, d.message)
+    c.is_clean('Victor Chang', 'N1=1;NS=2') => True
+
+    The fingerprints (see fingerprint()) of clean records are added
+    to clean, which may be any set-like container. Clean records are
+    not checked again, so passing in the fingerprints saved from a
+    previous run lets known-clean records skip checking altogether.
+
+    """
+    def __init__(self, clean=None):
+        self.clean = set() if clean is None else clean
+
+    def __repr__(self):
+        return "{}(<{} clean>)".format(self.__class__.__name__, len(self.clean))
+
+    def check(self, records, start=0):
+        """
+        Yield a Diagnostic for each problem found in records, an
+        iterable of (name_str, config_str, ...) tuples. Rows are
+        numbered from start. Please see check_row() for the checks
+        made.
+
+        """
+        clean = self.clean
+        for row, r in enumerate(records, start):
+            fp = fingerprint(r[0], r[1])
+            if fp in clean: continue
+            out = check_row(r[0], r[1], row)
+            if out: yield from out
+            else: clean.add(fp)
+
+    def is_clean(self, name_str, config_str):
+        """
+        Return True if the name and configuration string have no
+        problems, checking them only if not already known to be clean
+        """
+        fp = fingerprint(name_str, config_str)
+        if fp in self.clean: return True
+        if check_row(name_str, config_str): return False
+        self.clean.add(fp)
+        return True
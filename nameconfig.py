@@ -0,0 +1,167 @@
+"""
+Name Configuration Dictionary for Python
+
+Dense integer ids for canonical configuration strings, for storing
+names with a shared dictionary of configurations, for use with the
+Personal Name Toolkit reference implementation
+
+"""
+# Copyright 2023 by Moses Chong
+#
+# This program is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# This module uses spaces, not tabs
+
+from namestream import CONFIG_FIELD, NAME_FIELD, read_chunks, write_records
+from personalname import get_config
+
+CONFIG_ID_FIELD = 'config_id'  # field or column name for config ids
+
+class ConfigDictionary:
+    """
+    A dictionary of configuration strings in canonical form (as from
+    PersonalName.get_config_str()), each with a dense integer id
+    starting from zero, in order of first appearance.
+
+    Example:
+    d = ConfigDictionary()
+    d.get_id('NS=1;N1=2') => 0
+    d.get_id('N1=2;NS=1') => 0
+    d.get_id('NS=1;F1=NS;N1=2') => 1
+    d[1] => 'N1=2;NS=1;F1=1'
+    list(d.encode([('Inoue Daisuke', 'NS=1;N1=2')])) => [('Inoue Daisuke', 0)]
+
+    Each configuration string spelling is only parsed once, so that
+    canonicalising many records costs one dict lookup per record.
+
+    """
+    def __init__(self, config_strs=()):
+        self._configs = []  # canonical config_str, by id
+        self._ids = {}      # config_str, as written or canonical: id
+        for c in config_strs: self.get_id(c)
+
+    def __repr__(self):
+        return "{}(<{} configs>)".format(self.__class__.__name__, len(self))
+
+    def __len__(self):
+        return len(self._configs)
+
+    def __getitem__(self, config_id):
+        return self._configs[config_id]
+
+    def __iter__(self):
+        return iter(self._configs)
+
+    def get_id(self, config_str):
+        """
+        Return the id of config_str, adding it if it is not already
+        in the dictionary. Equivalent configuration strings have the
+        same id.
+
+        """
+        i = self._ids.get(config_str)
+        if i is not None: return i
+        c = get_config(config_str).config_str
+        i = self._ids.get(c)
+        if i is None:
+            i = len(self._configs)
+            self._configs.append(c)
+            self._ids[c] = i
+        self._ids[config_str] = i
+        return i
+
+    def canonical(self, config_str):
+        """
+        Return the canonical form of config_str
+        """
+        return self._configs[self.get_id(config_str)]
+
+    def encode(self, records):
+        """
+        Yield each (name_str, config_str, ...) record in records with
+        the config string replaced by its id, adding new
+        configurations to the dictionary
+        """
+        get_id = self.get_id
+        for r in records:
+            yield (r[0], get_id(r[1])) + tuple(r[2:])
+
+    def decode(self, records):
+        """
+        Yield each (name_str, config_id, ...) record in records with
+        the config id replaced by its canonical config string. Ids may
+        be integers, or integers as strings, such as from CSV files.
+
+        """
+        configs = self._configs
+        for r in records:
+            yield (r[0], configs[int(r[1])]) + tuple(r[2:])
+
+    def write(self, f, fmt=None):
+        """
+        Write the dictionary to a file as (config_id, config_str) rows.
+        Please see namestream.write_records() for details on f and fmt.
+
+        """
+        return write_records(
+            f, enumerate(self._configs), (CONFIG_ID_FIELD, CONFIG_FIELD), fmt
+        )
+
+    @classmethod
+    def read(cls, f, fmt=None):
+        """
+        Read a dictionary written by write(). Raises ValueError if the
+        ids are not in order from zero.
+
+        """
+        out = cls()
+        chunks = read_chunks(f, fmt, name_field=CONFIG_ID_FIELD)
+        for chunk in chunks:
+            for i, c in chunk:
+                if int(i) != len(out):
+                    raise ValueError('config id {} out of order'.format(i))
+                out._configs.append(c)
+                out._ids.setdefault(c, int(i))
+        return out
+
+def split_records(records, names_f, configs_f, fmt=None):
+    """
+    Write (name_str, config_str) records as (name_str, config_id)
+    rows to names_f, and their configurations as a ConfigDictionary
+    to configs_f. Returns the number of records and the dictionary.
+
+    Example:
+    split_records(records, 'n.csv', 'c.csv')
+    list(join_records('n.csv', 'c.csv')) # canonical config strings
+
+    Please see namestream.write_records() for details on the files
+    and fmt.
+
+    """
+    d = ConfigDictionary()
+    fields = (NAME_FIELD, CONFIG_ID_FIELD)
+    n = write_records(names_f, d.encode(records), fields, fmt)
+    d.write(configs_f, fmt)
+    return n, d
+
+def join_records(names_f, configs_f, fmt=None):
+    """
+    Yield (name_str, config_str) records from the files written by
+    split_records(), with config strings in canonical form.
+
+    """
+    d = ConfigDictionary.read(configs_f, fmt)
+    for chunk in read_chunks(names_f, fmt, config_field=CONFIG_ID_FIELD):
+        yield from d.decode(chunk)
@@ -0,0 +1,237 @@
+"""
+Derived Name Columns for Python
+
+Incremental upkeep of values derived from names, such as display
+names and sort names, from a feed of changes, for use with the
+Personal Name Toolkit reference implementation
+
+"""
+# Copyright 2023 by Moses Chong
+#
+# This program is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# This module uses spaces, not tabs
+
+from nameconfig import ConfigDictionary
+from personalname import PersonalName, compile_format
+
+INSERT = 'insert'  # change feed operations
+UPDATE = 'update'
+DELETE = 'delete'
+
+class DerivedColumns:
+    """
+    Columns of values derived from a roster of names, updated from a
+    feed of changes, recomputing only the values affected.
+
+    Example:
+    d = DerivedColumns({
+        'display': '{N1} {NS}',
+        'sort': '{NS}, {N1}',
+        'nosp': PersonalName.get_main_name_nosp,
+    })
+    d.apply([
+        (INSERT, 1, 'Inoue Daisuke', 'NS=1;N1=2'),
+        (INSERT, 2, 'Victor Chang', 'N1=1;NS=2'),
+    ]) => {1: {'display': 'Daisuke Inoue', ...}, 2: {...}}
+    d.apply([(UPDATE, 2, 'Victor Chang', 'NS=2;N1=1')]) => {} # no-op
+    d.get(1) => {'display': 'Daisuke Inoue', 'sort': 'Inoue, Daisuke',
+                 'nosp': 'InoueDaisuke'}
+
+    Columns are format strings for get_formatted_name(), or functions
+    that take a PersonalName and return a value, such as unbound
+    PersonalName methods. Setting a column with set_column() only
+    recomputes that column.
+
+    Config strings are kept as ids in a ConfigDictionary (configs),
+    so that an update is a no-op when its name string and canonical
+    config are unchanged. set_config() changes a shared configuration,
+    recomputing only the names using it.
+
+    """
+    def __init__(self, columns=None, configs=None):
+        """
+        columns is a dict of column names and columns, please see
+        set_column(). configs is a ConfigDictionary to share, a new
+        dictionary is used if not specified.
+
+        """
+        self.configs = ConfigDictionary() if configs is None else configs
+        self._rows = {}       # record id: (name_str, config id)
+        self._by_config = {}  # config id: set of record ids
+        self._columns = {}    # column name: (column, render function)
+        self._values = {}     # column name: {record id: value}
+        for k, v in (columns or {}).items(): self.set_column(k, v)
+
+    def __repr__(self):
+        return "{}({!r}, <{} rows>)".format(
+            self.__class__.__name__, list(self._columns), len(self)
+        )
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, rid):
+        return rid in self._rows
+
+    def _values_of(self, row, columns):
+        # compute the values of a (name_str, config id) row, without
+        # changing anything, so that a bad name fails on its own
+        name = PersonalName(row[0], self.configs[row[1]])
+        return {k: self._columns[k][1](name) for k in columns}
+
+    def _commit(self, rid, row, values):
+        # store a row and its values, returning the changed values
+        old = self._rows.get(rid)
+        if old != row:
+            if old is not None: self._by_config[old[1]].discard(rid)
+            self._rows[rid] = row
+            self._by_config.setdefault(row[1], set()).add(rid)
+        out = {}
+        for k, v in values.items():
+            vals = self._values[k]
+            if rid not in vals or vals[rid] != v: out[k] = v
+            vals[rid] = v
+        return out
+
+    def _delete(self, rid):
+        name_str, cid = self._rows.pop(rid)
+        self._by_config[cid].discard(rid)
+        for vals in self._values.values(): vals.pop(rid, None)
+
+    def apply(self, changes):
+        """
+        Apply changes, an iterable of (op, rid, name_str, config_str)
+        tuples, where op is INSERT, UPDATE or DELETE and rid is a
+        record id. Name and config strings may be left out for
+        DELETE. Returns the changed values, as a dict of record ids
+        and dicts of column names and values, with None for records
+        that were deleted.
+
+        INSERT and UPDATE both add the record if it is new. Updates
+        that leave the name string and canonical config unchanged are
+        skipped.
+
+        Changes are applied all or nothing. The values of every
+        inserted or updated record are worked out before any change
+        is stored, so if a change fails, such as for a malformed name,
+        its exception is raised and none of the changes are applied.
+        Raises KeyError when deleting a record that does not exist,
+        or for an unsupported op.
+
+        """
+        columns = tuple(self._columns)
+        staged = []   # (rid, row or None for deletes, values)
+        exists = {}   # record id: exists after the changes so far
+        for x in changes:
+            op, rid = x[0], x[1]
+            if op in (INSERT, UPDATE):
+                row = (x[2], self.configs.get_id(x[3]))
+                if rid not in exists and self._rows.get(rid) == row: continue
+                staged.append((rid, row, self._values_of(row, columns)))
+                exists[rid] = True
+            elif op == DELETE:
+                if not exists.get(rid, rid in self._rows):
+                    raise KeyError('no record {}'.format(rid))
+                staged.append((rid, None, None))
+                exists[rid] = False
+            else:
+                raise KeyError('unsupported op {}'.format(op))
+        out = {}
+        for rid, row, values in staged:
+            if row is None:
+                self._delete(rid)
+                out[rid] = None
+                continue
+            changed = self._commit(rid, row, values)
+            if changed: out[rid] = dict(out.get(rid) or {}, **changed)
+        return out
+
+    def get(self, rid):
+        """
+        Return the values of record rid as a dict of column names and
+        values, or None if there is no such record
+        """
+        if rid not in self._rows: return None
+        return {k: self._values[k][rid] for k in self._columns}
+
+    def column(self, k):
+        """
+        Return the values of column k as a dict of record ids and
+        values
+        """
+        return dict(self._values[k])
+
+    def set_column(self, k, column):
+        """
+        Add a column, or change an existing one, and compute its values
+        for all records. Returns the changed values, like apply().
+        Setting a column to the same format string or function is a
+        no-op. If a value cannot be worked out, the column is left as
+        it was.
+
+        """
+        old = self._columns.get(k)
+        if old is not None and old[0] == column: return {}
+        if isinstance(column, str): render = compile_format(column).apply
+        else: render = column
+        self._columns[k] = (column, render)
+        try:
+            new = {rid: self._values_of(row, (k,)) for rid, row in self._rows.items()}
+        except Exception:
+            if old is None: del self._columns[k]
+            else: self._columns[k] = old
+            raise
+        self._values.setdefault(k, {})
+        out = {}
+        for rid, values in new.items():
+            changed = self._commit(rid, self._rows[rid], values)
+            if changed: out[rid] = changed
+        return out
+
+    def remove_column(self, k):
+        """
+        Remove column k. Raises KeyError if there is no such column.
+        """
+        del self._columns[k]
+        del self._values[k]
+
+    def set_config(self, config_id, config_str):
+        """
+        Change the configuration of all records using the config id
+        config_id to config_str, and recompute their values. Returns
+        the changed values, like apply(). If a value cannot be worked
+        out, no record is changed.
+
+        """
+        cid = self.configs.get_id(config_str)
+        if cid == config_id: return {}
+        columns = tuple(self._columns)
+        staged = []
+        for rid in self._by_config.get(config_id, ()):
+            row = (self._rows[rid][0], cid)
+            staged.append((rid, row, self._values_of(row, columns)))
+        out = {}
+        for rid, row, values in staged:
+            changed = self._commit(rid, row, values)
+            if changed: out[rid] = changed
+        return out
+
+    def rows_using(self, config_id):
+        """
+        Return the record ids of all records using the config id
+        config_id, in sorted order
+        """
+        return sorted(self._by_config.get(config_id, ()))
@@ -0,0 +1,316 @@
+"""
+Name Element Index for Python
+
+Searchable indexes over large numbers of personal names, for use with
+the Personal Name Toolkit reference implementation
+
+"""
+# Copyright 2023 by Moses Chong
+#
+# This program is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# This module uses spaces, not tabs
+
+from bisect import bisect_left, insort
+from heapq import merge
+from personalname import PersonalName, get_config
+
+class _SortedKeys:
+    """
+    Sorted keys for prefix searches, with inexpensive inserts.
+
+    New keys are kept in a small sorted list, which is merged into
+    the main sorted list when it grows beyond the square root of the
+    size of the main list. Removed keys are left in place until the
+    next merge, and are skipped by checking against live, the dict
+    of keys in use.
+
+    """
+    def __init__(self, live):
+        self._live = live
+        self._main = []
+        self._new = []
+
+    def add(self, k):
+        insort(self._new, k)
+        if len(self._new) ** 2 > len(self._main):
+            last = None
+            main = []
+            for x in merge(self._main, self._new):
+                if x != last and x in self._live: main.append(x)
+                last = x
+            self._main = main
+            self._new = []
+
+    def startswith(self, prefix):
+        """
+        Yield all keys in use beginning with prefix
+        """
+        for keys in (self._main, self._new):
+            i = bisect_left(keys, prefix)
+            while i < len(keys) and keys[i].startswith(prefix):
+                if keys[i] in self._live: yield keys[i]
+                i += 1
+
+
+class NameIndex:
+    """
+    An index of personal names by the values of their main name
+    elements, for exact, prefix and case-insensitive searches by
+    element type.
+
+    Example:
+    x = NameIndex([
+        ('Inoue Daisuke', 'NS=1;N1=2'),
+        ('Angus MacGyver', 'N1=1;NS=2'),
+        ('Mary Macdonald', 'N1=1;NS=2'),
+    ])
+    x.find('NS', 'Inoue') => [0]
+    x.find_prefix('NS', 'Mac') => [1, 2]
+    x.find_prefix('NS', 'macd', casefold=True) => [2]
+    x.get(1) => PersonalName(Angus MacGyver, N1=1;NS=2)
+
+    Elements are indexed in presentation-ready form, with spaces in
+    place of space substitutes. Each name is given a numeric record
+    id when added; searches return lists of record ids in ascending
+    order.
+
+    Lookups take time in proportion to the number of results, and
+    not the number of names indexed.
+
+    """
+    def __init__(self, names=(), types=PersonalName.INDEXES_MAIN_NAME):
+        """
+        Args
+        ----
+        * names: an iterable of names to add, please see add()
+
+        * types: the element types to index; all supported types are
+          indexed by default
+
+        """
+        self.types = tuple(types)
+        self._names = {}     # record id: PersonalName
+        self._next_id = 0
+        self._exact = {}     # element type: {value: set of record ids}
+        self._folded = {}    # same as _exact, with casefolded values
+        self._sorted = {}    # (element type, casefold): _SortedKeys
+        for t in self.types:
+            self._exact[t] = {}
+            self._folded[t] = {}
+            self._sorted[(t, False)] = _SortedKeys(self._exact[t])
+            self._sorted[(t, True)] = _SortedKeys(self._folded[t])
+        for x in names: self.add(x)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, rid):
+        return rid in self._names
+
+    def _values(self, name):
+        # indexed (element type, value, casefolded value) of a name
+        for t in self.types:
+            v = name.get_main_name_element(t)
+            if v: yield t, v, v.casefold()
+
+    def add(self, name, rid=None):
+        """
+        Add a name to the index, and return its record id.
+
+        name may be a PersonalName, or a (name_str, config_str) pair.
+        When rid is not specified, the next unused id is assigned.
+        Adding a name with the id of an indexed name replaces it.
+
+        """
+        if not isinstance(name, PersonalName): name = PersonalName(*name)
+        if rid is None:
+            rid = self._next_id
+        elif rid in self._names:
+            self.remove(rid)
+        self._next_id = max(self._next_id, rid + 1)
+        self._names[rid] = name
+        for t, v, vf in self._values(name):
+            for idx, k, folded in ((self._exact, v, False), (self._folded, vf, True)):
+                ids = idx[t].get(k)
+                if ids is None:
+                    idx[t][k] = {rid}
+                    self._sorted[(t, folded)].add(k)
+                else:
+                    ids.add(rid)
+        return rid
+
+    def remove(self, rid):
+        """
+        Remove a name from the index by record id, and return it.
+        Raises KeyError if there is no name with the id.
+
+        """
+        name = self._names.pop(rid)
+        for t, v, vf in self._values(name):
+            for idx, k in ((self._exact, v), (self._folded, vf)):
+                ids = idx[t][k]
+                ids.discard(rid)
+                if not ids: del idx[t][k]
+        return name
+
+    def get(self, rid):
+        """
+        Return the name with the record id rid, or None if there
+        is no such name.
+
+        """
+        return self._names.get(rid)
+
+    def _index(self, el_type, casefold):
+        if el_type not in self._exact:
+            raise KeyError('element type {} not indexed'.format(el_type))
+        return self._folded[el_type] if casefold else self._exact[el_type]
+
+    def find(self, el_type, value, casefold=False):
+        """
+        Return the record ids of all names with an element of type
+        el_type equal to value. If casefold is True, the comparison
+        is case-insensitive.
+
+        """
+        idx = self._index(el_type, casefold)
+        if casefold: value = value.casefold()
+        return sorted(idx.get(value, ()))
+
+    def find_prefix(self, el_type, prefix, casefold=False):
+        """
+        Return the record ids of all names with an element of type
+        el_type that begins with prefix. If casefold is True, the
+        comparison is case-insensitive.
+
+        """
+        idx = self._index(el_type, casefold)
+        if casefold: prefix = prefix.casefold()
+        out = set()
+        for k in self._sorted[(el_type, casefold)].startswith(prefix):
+            out.update(idx[k])
+        return sorted(out)
+
+
+class HandleDirectory:
+    """
+    A directory of the network nicknames (handles) of personal names,
+    for finding names by handle.
+
+    Example:
+    d = HandleDirectory([
+        ('Moshe Cohen (Goat Man, thegoat1)', 'N1=1;NS=2;NN:example.com=2'),
+        ('Gauri Nanda (clocky)', 'N1=1;NS=2;NN:example.com=1;NN:example.org=1'),
+    ])
+    d.find('example.com', 'thegoat1') => [0]
+    d.handles('example.com') => ['clocky', 'thegoat1']
+    d.networks() => ['example.com', 'example.org']
+    d.get_handles(1) => {'example.com': 'clocky', 'example.org': 'clocky'}
+
+    Handles are found from the NN:<network> options of each name's
+    configuration. Each name is given a numeric record id when added,
+    like NameIndex.
+
+    """
+    def __init__(self, names=()):
+        """
+        names is an iterable of names to add, please see add()
+        """
+        self._names = {}     # record id: PersonalName
+        self._next_id = 0
+        self._handles = {}   # record id: {network: handle}
+        self._dir = {}       # network: {handle: set of record ids}
+        for x in names: self.add(x)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, rid):
+        return rid in self._names
+
+    def add(self, name, rid=None):
+        """
+        Add a name to the directory, and return its record id.
+
+        name may be a PersonalName, or a (name_str, config_str) pair.
+        When rid is not specified, the next unused id is assigned.
+        Adding a name with the id of a name in the directory replaces
+        it.
+
+        """
+        if not isinstance(name, PersonalName): name = PersonalName(*name)
+        if rid is None:
+            rid = self._next_id
+        elif rid in self._names:
+            self.remove(rid)
+        self._next_id = max(self._next_id, rid + 1)
+        self._names[rid] = name
+        handles = {}
+        for net, i in get_config(name.get_config_str()).networks():
+            h = name.get_alt_name(net)
+            if not h: continue
+            handles[net] = h
+            self._dir.setdefault(net, {}).setdefault(h, set()).add(rid)
+        if handles: self._handles[rid] = handles
+        return rid
+
+    def remove(self, rid):
+        """
+        Remove a name from the directory by record id, and return it.
+        Raises KeyError if there is no name with the id.
+
+        """
+        name = self._names.pop(rid)
+        for net, h in self._handles.pop(rid, {}).items():
+            ids = self._dir[net][h]
+            ids.discard(rid)
+            if not ids: del self._dir[net][h]
+            if not self._dir[net]: del self._dir[net]
+        return name
+
+    def get(self, rid):
+        """
+        Return the name with the record id rid, or None if there
+        is no such name.
+
+        """
+        return self._names.get(rid)
+
+    def get_handles(self, rid):
+        """
+        Return a dict of the handles of the name with the record id
+        rid, with networks as keys.
+
+        """
+        return dict(self._handles.get(rid, {}))
+
+    def find(self, network, handle):
+        """
+        Return the record ids of all names using handle on network
+        """
+        return sorted(self._dir.get(network, {}).get(handle, ()))
+
+    def handles(self, network):
+        """
+        Return all handles in use on network, in sorted order
+        """
+        return sorted(self._dir.get(network, ()))
+
+    def networks(self):
+        """
+        Return all networks with handles, in sorted order
+        """
+        return sorted(self._dir)
@@ -0,0 +1,215 @@
+"""
+Opt-in Profiling for PersonalName
+
+Call counts, timings and input size histograms for PersonalName
+methods, for finding out where time goes in production
+
+"""
+# Copyright 2023 by Moses Chong
+#
+# This program is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# This module uses spaces, not tabs
+#
+# Methods are only wrapped while profiling is enabled. When disabled,
+# the original methods are put back, so there is no overhead at all.
+
+import logging
+from contextlib import contextmanager
+from functools import wraps
+from random import randrange
+from threading import Event, Lock, Thread
+from time import perf_counter_ns
+from personalname import PersonalName, compile_format
+
+METHODS = (
+    '__init__',
+    '_set_config',
+    'parse_config',
+    'get_alt_name',
+    'get_formatted_name',
+    'get_main_name_element',
+    'get_main_name_element_type',
+    'get_main_name_elements_as_str',
+)
+SAMPLE_SIZE = 1024  # max timings kept per method for percentiles
+PERCENTILES = (50, 90, 99)
+
+_originals = {}     # method name: original class attribute
+_stats = {}         # method name: _MethodStats
+_lock = Lock()
+_logger_stop = None
+
+class _MethodStats:
+    __slots__ = ('calls', 'total_ns', 'samples', 'sizes')
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ns = 0
+        self.samples = []  # reservoir sample of timings
+        self.sizes = {}    # size type: {size: count}
+
+    def add(self, ns, sizes):
+        self.calls += 1
+        self.total_ns += ns
+        if len(self.samples) < SAMPLE_SIZE:
+            self.samples.append(ns)
+        else:
+            i = randrange(self.calls)
+            if i < SAMPLE_SIZE: self.samples[i] = ns
+        for k, v in sizes:
+            h = self.sizes.setdefault(k, {})
+            h[v] = h.get(v, 0) + 1
+
+    def snapshot(self):
+        out = {
+            'calls': self.calls,
+            'total_ms': self.total_ns / 1e6,
+            'mean_us': self.total_ns / self.calls / 1e3 if self.calls else 0,
+        }
+        samples = sorted(self.samples)
+        for p in PERCENTILES:
+            v = samples[min(len(samples) * p // 100, len(samples) - 1)] if samples else 0
+            out['p{}_us'.format(p)] = v / 1e3
+        out['sizes'] = {k: dict(sorted(v.items())) for k, v in self.sizes.items()}
+        return out
+
+def _sizes(name, args, kwargs, fn_name):
+    # input sizes of a call; names are already split by then
+    out = []
+    if isinstance(name, PersonalName) and fn_name not in ('__init__', '_set_config'):
+        out.append(('elements', name.count_main_name_elements()))
+        out.append(('alt_names', name.count_alt_names()))
+    if fn_name == 'get_formatted_name':
+        fmt = args[0] if args else kwargs.get('fmt', '')
+        out.append(('tags', len(compile_format(fmt).tags)))
+    return out
+
+def _wrap(fn_name, fn):
+    @wraps(fn)
+    def wrapper(obj, *args, **kwargs):
+        t = perf_counter_ns()
+        try:
+            return fn(obj, *args, **kwargs)
+        finally:
+            dt = perf_counter_ns() - t
+            sizes = _sizes(obj, args, kwargs, fn_name)
+            with _lock:
+                stats = _stats.get(fn_name)
+                if stats is None: stats = _stats[fn_name] = _MethodStats()
+                stats.add(dt, sizes)
+    return wrapper
+
+def enable(methods=METHODS):
+    """
+    Start recording calls to the PersonalName methods named in
+    methods. Please see METHODS for the default list.
+
+    """
+    with _lock:
+        for k in methods:
+            if k in _originals: continue
+            orig = PersonalName.__dict__[k]
+            _originals[k] = orig
+            if isinstance(orig, classmethod):
+                setattr(PersonalName, k, classmethod(_wrap(k, orig.__func__)))
+            else:
+                setattr(PersonalName, k, _wrap(k, orig))
+
+def disable():
+    """
+    Stop recording calls, and restore the original methods. Recorded
+    statistics are kept until reset() is called.
+
+    """
+    with _lock:
+        for k, orig in _originals.items():
+            setattr(PersonalName, k, orig)
+        _originals.clear()
+
+def is_enabled():
+    return bool(_originals)
+
+def reset():
+    """
+    Clear all recorded statistics
+    """
+    with _lock:
+        _stats.clear()
+
+@contextmanager
+def profiling(methods=METHODS):
+    """
+    Record calls within a with block:
+
+    with profiling():
+        run_job()
+    print(snapshot())
+
+    """
+    enable(methods)
+    try:
+        yield
+    finally:
+        disable()
+
+def snapshot():
+    """
+    Return the recorded statistics as a dict, by method name.
+
+    Each method has a count of calls, the total time in milliseconds,
+    the mean and percentile times in microseconds, and histograms of
+    input sizes: main name element count ('elements'), alternate name
+    count ('alt_names') and format tag count ('tags'), as {size:
+    number of calls}.
+
+    Percentiles are estimated from a random sample of up to
+    SAMPLE_SIZE calls.
+
+    """
+    with _lock:
+        return {k: v.snapshot() for k, v in _stats.items() if v.calls}
+
+def log_line():
+    """
+    Return a one-line summary of the recorded statistics
+    """
+    parts = []
+    for k, v in sorted(snapshot().items()):
+        parts.append('{} n={} mean={:.1f}us p50={:.1f}us p99={:.1f}us'.format(
+            k, v['calls'], v['mean_us'], v['p50_us'], v['p99_us']
+        ))
+    return '; '.join(parts) or 'no calls recorded'
+
+def start_logging(interval=60, logger=None, level=logging.INFO):
+    """
+    Log a summary line (see log_line()) every interval seconds on a
+    background thread, until stop_logging() is called.
+
+    """
+    global _logger_stop
+    stop_logging()
+    logger = logger or logging.getLogger(__name__)
+    stop = _logger_stop = Event()
+    def run():
+        while not stop.wait(interval):
+            logger.log(level, log_line())
+    Thread(target=run, name='nameprof', daemon=True).start()
+
+def stop_logging():
+    global _logger_stop
+    if _logger_stop is not None:
+        _logger_stop.set()
+        _logger_stop = None
@@ -0,0 +1,157 @@
+"""
+Name Collation and External Sorting for Python
+
+Collation keys by main name element type, and sorting of name
+records larger than memory, for use with the Personal Name Toolkit
+reference implementation
+
+"""
+# Copyright 2023 by Moses Chong
+#
+# This program is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# This module uses spaces, not tabs
+
+import pickle
+from heapq import merge
+from itertools import count, islice
+from tempfile import TemporaryFile
+from namestream import CONFIG_FIELD, NAME_FIELD, read_chunks, write_records
+from nametable import NameTable
+from personalname import PersonalName
+
+ORDER = ('NS', 'N1', 'NM', 'OA')  # default order: surname, first name...
+RUN_SIZE = 100000                 # default max records sorted in memory
+MISSING_LAST = '\U0010ffff'       # sorts after all other strings
+_BATCH = 1000                     # records per pickle in spill files
+
+def _check_order(order):
+    for t in order:
+        if t not in PersonalName.INDEXES_MAIN_NAME:
+            raise KeyError('unsupported element {}'.format(t))
+    return tuple(order)
+
+def _fold(v, fold, missing):
+    if not v: return missing
+    return v.casefold() if fold else v
+
+def make_collation_key(order=ORDER, fold=True, missing_last=False):
+    """
+    Return a function that makes a collation key from a PersonalName,
+    for use as a sort key.
+
+    Example:
+    k = make_collation_key(('NS', 'N1'))
+    sorted(names, key=k)  # by surname, then first name
+
+    order is a sequence of main name element types. If fold is True,
+    elements are casefolded. Missing elements are taken as
+    PersonalName.OUT_DEFAULT, and sort first, unless missing_last is
+    True.
+
+    """
+    order = _check_order(order)
+    missing = MISSING_LAST if missing_last else PersonalName.OUT_DEFAULT
+    def key(name):
+        return tuple(
+            _fold(name.get_main_name_element(t), fold, missing) for t in order
+        )
+    return key
+
+def collation_keys(records, order=ORDER, fold=True, missing_last=False):
+    """
+    Return a list of collation keys, one for each (name_str,
+    config_str, ...) record in records, like make_collation_key().
+    Elements are extracted for all records at once, please see
+    nametable.NameTable.
+
+    """
+    order = _check_order(order)
+    missing = MISSING_LAST if missing_last else PersonalName.OUT_DEFAULT
+    t = NameTable([r[0] for r in records], [r[1] for r in records])
+    cols = [
+        [_fold(v, fold, missing) for v in t.get_main_name_element(k)]
+        for k in order
+    ]
+    return list(zip(*cols))
+
+def _spill(h, run):
+    # append a sorted run to the spill file h, returning its offsets
+    start = h.seek(0, 2)
+    for i in range(0, len(run), _BATCH):
+        pickle.dump(run[i:i+_BATCH], h, pickle.HIGHEST_PROTOCOL)
+    return start, h.tell()
+
+def _read_run(h, start, end):
+    # read back a run from the spill file h, which is shared by all
+    # runs being merged, so seek before each batch
+    pos = start
+    while pos < end:
+        h.seek(pos)
+        batch = pickle.load(h)
+        pos = h.tell()
+        yield from batch
+
+def sort_records(
+    records, order=ORDER, fold=True, missing_last=False, run_size=RUN_SIZE
+):
+    """
+    Yield records, an iterable of (name_str, config_str, ...) tuples,
+    sorted by collation key (see make_collation_key()). Records with
+    equal keys are kept in their original order. Any further items
+    in the records, such as record ids, are kept as-is.
+
+    Example:
+    sort_records(records, ('NS', 'N1'))  # by surname, then first name
+
+    Up to run_size records are sorted at a time in memory. When there
+    are more records, the sorted runs are written one after another
+    to a single temporary file, and merged while being read back in
+    batches. Only one file is kept open, and memory use is about
+    run_size records, plus a batch of records for each run.
+
+    """
+    it = iter(records)
+    seq = count()
+    chunk = list(islice(it, run_size))
+    keys = collation_keys(chunk, order, fold, missing_last)
+    run = sorted(zip(keys, seq, chunk))
+    if len(chunk) < run_size:
+        for k, i, r in run: yield r
+        return
+    with TemporaryFile() as h:
+        runs = []
+        while run:
+            runs.append(_spill(h, run))
+            chunk = list(islice(it, run_size))
+            keys = collation_keys(chunk, order, fold, missing_last)
+            run = sorted(zip(keys, seq, chunk))
+        for k, i, r in merge(*(_read_run(h, s, e) for s, e in runs)):
+            yield r
+
+def sort_file(src, dst, order=ORDER, fmt=None, dst_fmt=None, **kwargs):
+    """
+    Sort the names in the file src into the file dst, like
+    sort_records(). Please see namestream.read_chunks() for the
+    supported file formats. Returns the number of records written.
+
+    Further keyword arguments are passed to sort_records().
+
+    """
+    records = (r for chunk in read_chunks(src, fmt) for r in chunk)
+    return write_records(
+        dst, sort_records(records, order, **kwargs),
+        (NAME_FIELD, CONFIG_FIELD), dst_fmt
+    )
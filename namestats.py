@@ -0,0 +1,279 @@
+"""
+Name Statistics for Python
+
+Single-pass frequency statistics over streams of names, in exact or
+bounded-memory approximate modes, for use with the Personal Name
+Toolkit reference implementation
+
+"""
+# Copyright 2023 by Moses Chong
+#
+# This program is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# This module uses spaces, not tabs
+
+from array import array
+from collections import Counter
+from copy import deepcopy
+from hashlib import blake2b
+from itertools import islice
+from math import ceil, e, log
+from nametable import NameTable
+from personalname import PersonalName, get_config
+
+CHUNK_SIZE = 10000       # default number of records counted at a time
+TYPES = ('NS', 'N1')     # default element types to count
+NETWORKS = 'networks'    # field names for nickname networks and configs
+CONFIGS = 'config_str'
+EPSILON = 0.0001         # default approximate mode error, as share of total
+DELTA = 0.01             # default chance of exceeding the error
+TOP = 1000               # default number of heavy hitters kept
+
+class FrequencySketch:
+    """
+    A bounded-memory, approximate frequency counter: a count-min
+    sketch, with a list of the most frequent keys (heavy hitters).
+
+    Example:
+    s = FrequencySketch(epsilon=0.001, delta=0.01, top=10)
+    s.update(['Chang', 'Chong', 'Chang'])
+    s['Chang'] => 2
+    s.most_common(1) => [('Chang', 2)]
+
+    Counts are never under-estimated, and are over-estimated by no
+    more than epsilon * total, except at a chance of delta. Memory
+    use depends only on epsilon, delta and top.
+
+    Keys are hashed with a fixed hash, so that sketches with the same
+    epsilon and delta may be merged, even when counted in different
+    processes.
+
+    """
+    def __init__(self, epsilon=EPSILON, delta=DELTA, top=TOP):
+        if not (0 < epsilon < 1 and 0 < delta < 1):
+            raise ValueError('epsilon and delta must be between 0 and 1')
+        self.epsilon = epsilon
+        self.delta = delta
+        self.top = top
+        self.total = 0
+        self._width = ceil(e / epsilon)
+        self._depth = ceil(log(1 / delta))
+        self._rows = [array('Q', bytes(8 * self._width)) for _ in range(self._depth)]
+        self._top = {}   # heavy hitter: estimated count
+        self._floor = 0  # lowest estimate in self._top, may be stale
+
+    def __repr__(self):
+        return "{}(epsilon={!r}, delta={!r}, top={!r})".format(
+            self.__class__.__name__, self.epsilon, self.delta, self.top
+        )
+
+    def __getitem__(self, key):
+        return min(r[i] for r, i in zip(self._rows, self._cells(key)))
+
+    def _cells(self, key):
+        # column of the key in each row, by double hashing
+        d = blake2b(str(key).encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        h1 = int.from_bytes(d[:8], 'little')
+        h2 = int.from_bytes(d[8:], 'little') | 1
+        w = self._width
+        return [(h1 + j * h2) % w for j in range(self._depth)]
+
+    def _offer(self, key, n):
+        # keep key if it is among the top estimates
+        tops = self._top
+        if key in tops or len(tops) < self.top:
+            tops[key] = n
+            return
+        if n <= self._floor: return
+        k_min = min(tops, key=tops.get)
+        self._floor = tops[k_min]
+        if n <= self._floor: return
+        del tops[k_min]
+        tops[key] = n
+        self._floor = min(tops.values())
+
+    def add(self, key, n=1):
+        """
+        Count key n times, and return its new estimated count
+        """
+        est = None
+        for r, i in zip(self._rows, self._cells(key)):
+            r[i] += n
+            est = r[i] if est is None else min(est, r[i])
+        self.total += n
+        self._offer(key, est)
+        return est
+
+    def update(self, keys):
+        """
+        Count each key in keys, or each key in a mapping of keys to
+        counts, like collections.Counter.update()
+
+        """
+        for k, n in Counter(keys).items(): self.add(k, n)
+
+    def most_common(self, n=None):
+        """
+        Return up to n heavy hitters and their estimated counts, from
+        the most common to the least, like collections.Counter.
+        Only the top keys are kept, so n is limited to top.
+
+        """
+        out = sorted(self._top.items(), key=lambda x: x[1], reverse=True)
+        return out if n is None else out[:n]
+
+    def merge(self, other):
+        """
+        Add the counts of the sketch other to this sketch. Both sketches
+        must have the same epsilon and delta. Returns this sketch.
+
+        """
+        if (self._width, self._depth) != (other._width, other._depth):
+            raise ValueError('sketches differ in epsilon or delta')
+        for r, ro in zip(self._rows, other._rows):
+            for i, x in enumerate(ro):
+                if x: r[i] += x
+        self.total += other.total
+        keys = set(self._top).union(other._top)
+        self._top = {}
+        self._floor = 0
+        for k in keys: self._offer(k, self[k])
+        return self
+
+
+class NameStats:
+    """
+    Frequency statistics of a stream of names, counted in one pass.
+
+    Example:
+    s = NameStats(('NS', 'N1'))
+    s.update(chain.from_iterable(read_chunks('names.csv')))
+    s.most_common('NS', 10)           # most common surnames
+    s.most_common(NETWORKS)           # names with handles, by network
+    s.get(CONFIGS, 'N1=1;NS=2')       # names using a configuration
+    s.element_counts => Counter({2: 9000, 3: 1000})
+
+    For each element type in types, the values of the element are
+    counted, as are the nickname networks with handles and the
+    (normalised) configuration strings of names. Histograms of the
+    number of main name elements and alternate names of each name
+    are kept in element_counts and alt_name_counts.
+
+    When approx is True, values are counted in bounded memory with a
+    FrequencySketch of the given epsilon, delta and top, instead of
+    in a Counter with an entry for every value.
+
+    Statistics counted over separate shards may be combined with
+    merge() or the + and += operators, as long as they were set up
+    with the same arguments.
+
+    """
+    def __init__(
+        self, types=TYPES, approx=False, epsilon=EPSILON, delta=DELTA, top=TOP
+    ):
+        for t in types:
+            if t not in PersonalName.INDEXES_MAIN_NAME:
+                raise KeyError('unsupported element {}'.format(t))
+        self.types = tuple(types)
+        self.approx = approx
+        self._args = (epsilon, delta, top)
+        self.count = 0
+        self.element_counts = Counter()
+        self.alt_name_counts = Counter()
+        self._freqs = {}
+        for f in self.types + (NETWORKS, CONFIGS):
+            self._freqs[f] = FrequencySketch(*self._args) if approx else Counter()
+
+    def __repr__(self):
+        return "{}({!r}, approx={!r})".format(
+            self.__class__.__name__, self.types, self.approx
+        )
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+    def __add__(self, other):
+        return deepcopy(self).merge(other)
+
+    def _update_chunk(self, chunk):
+        names = [x[0] for x in chunk]
+        configs = [x[1] for x in chunk]
+        t = NameTable(names, configs)
+        self.count += len(chunk)
+        self.element_counts.update(t.count_main_name_elements())
+        self.alt_name_counts.update(t.count_alt_names())
+        for k in self.types:
+            self._freqs[k].update(x for x in t.get_main_name_element(k) if x)
+        nets = set()
+        for c in set(configs):
+            nets.update(net for net, i in get_config(c).networks())
+        for net in sorted(nets):
+            n = sum(1 for x in t.get_alt_name(net) if x)
+            if n: self._freqs[NETWORKS].update({net: n})
+        c_counts = Counter()
+        for c, n in Counter(configs).items():
+            c_counts[get_config(c).config_str] += n
+        self._freqs[CONFIGS].update(c_counts)
+
+    def update(self, records, chunk_size=CHUNK_SIZE):
+        """
+        Count the names in records, an iterable of (name_str,
+        config_str, ...) tuples, chunk_size names at a time.
+        Returns the number of names counted.
+
+        """
+        start = self.count
+        it = iter(records)
+        chunk = list(islice(it, chunk_size))
+        while chunk:
+            self._update_chunk(chunk)
+            chunk = list(islice(it, chunk_size))
+        return self.count - start
+
+    def get(self, field, value):
+        """
+        Return the count of value in field, which is an element type
+        in self.types, NETWORKS or CONFIGS. In approximate mode, the
+        count is an estimate.
+
+        """
+        return self._freqs[field][value]
+
+    def most_common(self, field, n=None):
+        """
+        Return up to n of the most common values in field, with their
+        counts, like collections.Counter.most_common(). Please see
+        get() for the supported fields.
+
+        """
+        return self._freqs[field].most_common(n)
+
+    def merge(self, other):
+        """
+        Add the statistics in other to these statistics. Returns these
+        statistics.
+
+        """
+        if (self.types, self.approx, self._args) != (
+            other.types, other.approx, other._args
+        ):
+            raise ValueError('statistics differ in types or mode')
+        self.count += other.count
+        self.element_counts.update(other.element_counts)
+        self.alt_name_counts.update(other.alt_name_counts)
+        for f, x in self._freqs.items():
+            if self.approx: x.merge(other._freqs[f])
+            else: x.update(other._freqs[f])
+        return self
@@ -0,0 +1,336 @@
+"""
+Binary Name Store for Python
+
+A compact on-disk format for large numbers of personal names with
+precomputed element offsets, and a memory-mapped reader, for use with
+the Personal Name Toolkit reference implementation
+
+"""
+# Copyright 2023 by Moses Chong
+#
+# This program is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# This module uses spaces, not tabs
+#
+# File layout
+# -----------
+# All numbers are little-endian. Each section starts at a multiple of
+# eight bytes from the start of the file, padded with zero bytes.
+#
+# 1. Header, see HEADER: magic number, record count, config count,
+#    element count, alternate name count, size of the name buffer and
+#    size of the config buffer in bytes
+# 2. Name buffer: all name strings in UTF-8, back-to-back
+# 3. Config buffer: all distinct configurations as canonical config
+#    strings (see NameConfig.config_str) in UTF-8, back-to-back
+# 4. Config offsets: (config count + 1) uint32, start of each config
+#    string in the config buffer, and the end of the last
+# 5. Row starts: (record count + 1) uint64, start of each name in the
+#    name buffer, and the end of the last
+# 6. Row configs: (record count) uint32, config number of each name
+# 7. Row elements: (record count + 1) uint64, number of the first main
+#    name element of each name, and the element count
+# 8. Element starts, element ends: (element count) uint32 each, byte
+#    offsets of main name elements from the start of their name
+# 9. Row alternate names: like row elements, for alternate names
+# 10. Alternate name starts, ends: like element starts and ends
+
+import mmap
+import struct
+import sys
+from array import array
+from shutil import copyfileobj
+from tempfile import TemporaryFile
+from personalname import PersonalName, compile_format, get_config
+
+MAGIC = b'PNTKNS\x00\x01'
+HEADER = struct.Struct('<8sIIQQQQ')
+FLUSH_SIZE = 65536  # array items to buffer before writing to disk
+
+def _pad(n):
+    return -n % 8
+
+def _byte_offsets(s, offsets):
+    # convert str offsets to UTF-8 byte offsets
+    if s.isascii(): return offsets
+    return [len(s[:x].encode('utf-8')) for x in offsets]
+
+class _Section:
+    # an array written to a temporary file as it grows
+    def __init__(self, typecode, initial=()):
+        self.file = TemporaryFile()
+        self.buf = array(typecode, initial)
+        self.count = len(self.buf)
+
+    def extend(self, items):
+        self.buf.extend(items)
+        self.count += len(items)
+        if len(self.buf) >= FLUSH_SIZE: self.flush()
+
+    def append(self, x):
+        self.buf.append(x)
+        self.count += 1
+        if len(self.buf) >= FLUSH_SIZE: self.flush()
+
+    def flush(self):
+        if sys.byteorder == 'big': self.buf.byteswap()
+        self.buf.tofile(self.file)
+        del self.buf[:]
+
+    def copy_to(self, h):
+        self.flush()
+        self.file.seek(0)
+        copyfileobj(self.file, h)
+        size = self.count * self.buf.itemsize
+        h.write(bytes(_pad(size)))
+        self.file.close()
+
+def write_store(path, records):
+    """
+    Write records, an iterable of (name_str, config_str) pairs, to a
+    new name store file at path. Returns the number of records.
+
+    Records are read in a single pass; offsets are written to
+    temporary files as they are worked out, so memory use does not
+    grow with the number of records.
+
+    """
+    configs = {}   # canonical config_str: config number
+    row_start = _Section('Q', (0,))
+    row_config = _Section('I')
+    el_row = _Section('Q', (0,))
+    el_start = _Section('I')
+    el_end = _Section('I')
+    alt_row = _Section('Q', (0,))
+    alt_start = _Section('I')
+    alt_end = _Section('I')
+    pos = 0
+    with open(path, mode='wb') as h:
+        h.write(bytes(HEADER.size + _pad(HEADER.size)))
+        for name_str, config_str in records:
+            config = get_config(config_str)
+            cid = configs.setdefault(config.config_str, len(configs))
+            s, e = config.alt_list_bounds(name_str)
+            sp = _byte_offsets(name_str, config.main_name_spans(name_str, 0, s))
+            el_start.extend(sp[0::2])
+            el_end.extend(sp[1::2])
+            el_row.append(el_start.count)
+            sp = _byte_offsets(name_str, config.alt_name_spans(name_str, s, e))
+            alt_start.extend(sp[0::2])
+            alt_end.extend(sp[1::2])
+            alt_row.append(alt_start.count)
+            b = name_str.encode('utf-8')
+            h.write(b)
+            pos += len(b)
+            row_start.append(pos)
+            row_config.append(cid)
+        h.write(bytes(_pad(pos)))
+        config_buf = ''.join(configs).encode('utf-8')
+        h.write(config_buf)
+        h.write(bytes(_pad(len(config_buf))))
+        config_offsets = _Section('I', (0,))
+        end = 0
+        for c in configs:
+            end += len(c.encode('utf-8'))
+            config_offsets.append(end)
+        for x in (
+            config_offsets, row_start, row_config, el_row, el_start, el_end,
+            alt_row, alt_start, alt_end
+        ):
+            x.copy_to(h)
+        h.seek(0)
+        h.write(HEADER.pack(
+            MAGIC, row_config.count, len(configs), el_start.count,
+            alt_start.count, pos, len(config_buf)
+        ))
+    return row_config.count
+
+
+class NameStore:
+    """
+    Read-only, random access to the names in a name store file,
+    without loading the file into memory.
+
+    Example:
+    write_store('names.pns', [('Inoue Daisuke', 'NS=1;N1=2'), ...])
+    with NameStore('names.pns') as s:
+        s.get_main_name_element(0, 'N1') => 'Daisuke'
+        s[0] => PersonalName(Inoue Daisuke, NS=1;N1=2)
+
+    The file is memory-mapped. Element offsets are read from the file,
+    so names are not split when the store is opened or read. Only the
+    configurations are parsed when the store is opened.
+
+    Records are addressed by number, starting from zero like Python
+    sequences. Element and alternate name indexes start from one, like
+    PersonalName.
+
+    """
+    OUT_DEFAULT = PersonalName.OUT_DEFAULT
+
+    def __init__(self, path):
+        self._file = open(path, mode='rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, n, n_configs, n_el, n_alt, names_size, configs_size
+            ) = HEADER.unpack_from(self._mm)
+        if magic != MAGIC: raise ValueError('not a name store file')
+        pos = HEADER.size + _pad(HEADER.size)
+        self._names_start = pos
+        pos += names_size + _pad(names_size)
+        config_buf = self._mm[pos:pos+configs_size].decode('utf-8')
+        pos += configs_size + _pad(configs_size)
+        sections = []
+        for code, count in (
+            ('I', n_configs + 1), ('Q', n + 1), ('I', n), ('Q', n + 1),
+            ('I', n_el), ('I', n_el), ('Q', n + 1), ('I', n_alt),
+            ('I', n_alt)
+        ):
+            size = count * array(code).itemsize
+            sections.append(self._section(code, pos, size))
+            pos += size + _pad(size)
+        (config_offsets, self._row_start, self._row_config, self._el_row,
+            self._el_start, self._el_end, self._alt_row, self._alt_start,
+            self._alt_end) = sections
+        self._configs = [
+            get_config(config_buf[config_offsets[i]:config_offsets[i+1]])
+            for i in range(n_configs)
+        ]
+
+    def _section(self, code, pos, size):
+        if sys.byteorder == 'big':
+            # arrays are little-endian, so load and convert instead
+            out = array(code, self._mm[pos:pos+size])
+            out.byteswap()
+            return out
+        return memoryview(self._mm)[pos:pos+size].cast(code)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self._row_config)
+
+    def __getitem__(self, n):
+        """
+        Return record number n as a PersonalName
+        """
+        n = self._record(n)
+        return PersonalName(self.get_name_str(n), self.get_config_str(n))
+
+    def close(self):
+        """
+        Close the store. Names already read remain usable.
+        """
+        for x in (
+            self._row_start, self._row_config, self._el_row,
+            self._el_start, self._el_end, self._alt_row, self._alt_start,
+            self._alt_end
+        ):
+            if isinstance(x, memoryview): x.release()
+        self._mm.close()
+        self._file.close()
+
+    def _record(self, n):
+        if n < 0: n += len(self)
+        if not 0 <= n < len(self): raise IndexError('record out of range')
+        return n
+
+    def _text(self, n, s, e):
+        base = self._names_start + self._row_start[n]
+        return self._mm[base+s:base+e].decode('utf-8')
+
+    def count_alt_names(self, n):
+        """
+        Return the number of alternate names of record n
+        """
+        n = self._record(n)
+        return self._alt_row[n+1] - self._alt_row[n]
+
+    def count_main_name_elements(self, n):
+        """
+        Return the number of main name elements of record n
+        """
+        n = self._record(n)
+        return self._el_row[n+1] - self._el_row[n]
+
+    def get_alt_name(self, n, i=1):
+        """
+        Return an alternate name of record n by numeric index or
+        network name, like PersonalName.get_alt_name(). Returns
+        OUT_DEFAULT if there is no such alternate name.
+
+        """
+        n = self._record(n)
+        if issubclass(type(i), str):
+            nn_fq = ''.join(
+                (PersonalName.NICKNAME_PREFIX, PersonalName.NICKNAME_NET_DELIM, i)
+            )
+            i = self._configs[self._row_config[n]].get(nn_fq)
+            if not i or i < 1: return self.OUT_DEFAULT
+        elif i < 1: raise IndexError('first element is one')
+        k = self._alt_row[n] + i - 1
+        if k >= self._alt_row[n+1]: return self.OUT_DEFAULT
+        return self._text(n, self._alt_start[k], self._alt_end[k])
+
+    def get_config_str(self, n):
+        """
+        Return the canonical config string of record n
+        """
+        return self._configs[self._row_config[self._record(n)]].config_str
+
+    def get_formatted_name(self, n, fmt):
+        """
+        Return record n in a user-nominated format, according to a
+        format string. Please see PersonalName.get_formatted_name()
+        for the format code.
+
+        """
+        n = self._record(n)
+        return compile_format(fmt).render(
+            lambda i: self.get_main_name_element(n, i)
+        )
+
+    def get_main_name_element(self, n, i):
+        """
+        Return an element of the main name of record n by type or by
+        numerical index, like PersonalName.get_main_name_element().
+
+        """
+        n = self._record(n)
+        config = self._configs[self._row_config[n]]
+        if issubclass(type(i), str):
+            if i == PersonalName.NICKNAME_PREFIX:
+                raise KeyError('{}: use get_alt_name for alternate names'.format(i))
+            if i not in PersonalName.INDEXES_MAIN_NAME:
+                raise KeyError('unsupported element')
+            i = config[i]
+            if not i: return self.OUT_DEFAULT
+        if not i: raise IndexError('first element is one')
+        a = self._el_row[n]
+        b = self._el_row[n+1]
+        k = a + i - 1 if i > 0 else b + i
+        if not a <= k < b: return self.OUT_DEFAULT
+        el = self._text(n, self._el_start[k], self._el_end[k])
+        return el.translate(config.tdict)
+
+    def get_name_str(self, n):
+        """
+        Return the name string of record n
+        """
+        n = self._record(n)
+        return self._text(n, 0, self._row_start[n+1] - self._row_start[n])
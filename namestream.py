@@ -0,0 +1,198 @@
+"""
+Streaming Name Reader and Writer for Python
+
+Chunked reading and writing of name strings and config strings in
+CSV, TSV and JSON Lines files of any size, for use with the Personal
+Name Toolkit reference implementation
+
+"""
+# Copyright 2023 by Moses Chong
+#
+# This program is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# This module uses spaces, not tabs
+#
+# All readers and writers work on one chunk of records at a time, so
+# memory use depends on the chunk size, not on the size of the file.
+
+import csv
+import json
+from contextlib import contextmanager
+from itertools import chain, islice
+from os import PathLike, fspath
+from nametable import NameTable
+from personalname import PersonalName
+
+CHUNK_SIZE = 10000         # default number of records per chunk
+NAME_FIELD = 'name_str'    # default field or column names
+CONFIG_FIELD = 'config_str'
+FORMATS = {                # supported file formats by file extension
+    '.csv': 'csv',
+    '.tsv': 'tsv',
+    '.tab': 'tsv',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+}
+
+def _get_format(f, fmt):
+    if fmt: return fmt
+    if isinstance(f, (str, PathLike)):
+        path = fspath(f)
+        for ext in FORMATS:
+            if path.endswith(ext): return FORMATS[ext]
+    raise ValueError('cannot guess file format, please specify fmt')
+
+@contextmanager
+def _open(f, mode, encoding):
+    # open paths, pass file objects through unchanged
+    if isinstance(f, (str, PathLike)):
+        with open(f, mode=mode, encoding=encoding, newline='') as h:
+            yield h
+    else:
+        yield f
+
+def _chunks(it, chunk_size):
+    it = iter(it)
+    chunk = list(islice(it, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(it, chunk_size))
+
+def read_chunks(
+    f, fmt=None, name_field=NAME_FIELD, config_field=CONFIG_FIELD,
+    chunk_size=CHUNK_SIZE, encoding='utf-8'
+):
+    """
+    Read (name_str, config_str) pairs from a file, yielding them in
+    lists of up to chunk_size pairs.
+
+    f may be a path or a text file object. fmt is one of 'csv', 'tsv'
+    or 'jsonl'; when not specified, it is guessed from the file
+    extension (see FORMATS).
+
+    CSV and TSV files must have a header row. In JSON Lines files,
+    each line is an object. Names and config strings are read from
+    the columns or keys named by name_field and config_field. Records
+    without a config string get an empty config string.
+
+    """
+    fmt = _get_format(f, fmt)
+    with _open(f, 'r', encoding) as h:
+        if fmt == 'jsonl':
+            objs = (json.loads(x) for x in h if x.strip())
+        elif fmt in ('csv', 'tsv'):
+            dialect = 'excel-tab' if fmt == 'tsv' else 'excel'
+            objs = csv.DictReader(h, dialect=dialect)
+        else:
+            raise ValueError('unsupported format {}'.format(fmt))
+        pairs = (
+            (x[name_field], '' if x.get(config_field) is None else x[config_field])
+            for x in objs
+        )
+        yield from _chunks(pairs, chunk_size)
+
+def parse_chunks(chunks):
+    """
+    Yield each chunk of (name_str, config_str) pairs from chunks as
+    a list of PersonalName.
+
+    """
+    for chunk in chunks:
+        yield [PersonalName(n, c) for n, c in chunk]
+
+def project_chunks(chunks, fields):
+    """
+    Yield each chunk of (name_str, config_str) pairs from chunks as a
+    list of tuples, with one item for each field in fields.
+
+    Fields may be a main name element type (e.g. 'NS'), 'name_str'
+    or 'config_str' for the original strings, or a format string for
+    get_formatted_name() (e.g. '{NS}, {N1}').
+
+    Example:
+    project_chunks(read_chunks('names.csv'), ('N1', 'NS', '{N1} {NS}'))
+
+    Elements are extracted from a whole chunk at once, please see
+    nametable.NameTable.
+
+    """
+    for chunk in chunks:
+        if not chunk: continue
+        names, configs = zip(*chunk)
+        t = NameTable(names, configs)
+        cols = []
+        for k in fields:
+            if k == NAME_FIELD: cols.append(names)
+            elif k == CONFIG_FIELD: cols.append(configs)
+            elif k in PersonalName.INDEXES_MAIN_NAME:
+                cols.append(t.get_main_name_element(k))
+            else: cols.append(t.get_formatted_name(k))
+        yield list(zip(*cols))
+
+def read_names(f, fmt=None, chunk_size=CHUNK_SIZE, **kwargs):
+    """
+    Yield a PersonalName for each record in a file. Please see
+    read_chunks() for details on the arguments.
+
+    """
+    chunks = read_chunks(f, fmt, chunk_size=chunk_size, **kwargs)
+    return chain.from_iterable(parse_chunks(chunks))
+
+def read_fields(f, fields, fmt=None, chunk_size=CHUNK_SIZE, **kwargs):
+    """
+    Yield a tuple of fields for each record in a file. Please see
+    read_chunks() and project_chunks() for details on the arguments.
+
+    """
+    chunks = read_chunks(f, fmt, chunk_size=chunk_size, **kwargs)
+    return chain.from_iterable(project_chunks(chunks, fields))
+
+def write_records(
+    f, rows, fields=None, fmt=None, chunk_size=CHUNK_SIZE, encoding='utf-8'
+):
+    """
+    Write rows, an iterable of tuples, to a file in chunks of up to
+    chunk_size rows. Returns the number of rows written.
+
+    f may be a path or a text file object. fmt is one of 'csv', 'tsv'
+    or 'jsonl'; when not specified, it is guessed from the file
+    extension.
+
+    fields are the column names. CSV and TSV files get a header row
+    when fields are specified. In JSON Lines files, rows are written
+    as objects with fields as keys when fields are specified, or as
+    arrays otherwise.
+
+    """
+    fmt = _get_format(f, fmt)
+    i = 0
+    with _open(f, 'w', encoding) as h:
+        if fmt in ('csv', 'tsv'):
+            dialect = 'excel-tab' if fmt == 'tsv' else 'excel'
+            w = csv.writer(h, dialect=dialect)
+            if fields: w.writerow(fields)
+            for chunk in _chunks(rows, chunk_size):
+                w.writerows(chunk)
+                i += len(chunk)
+        elif fmt == 'jsonl':
+            for chunk in _chunks(rows, chunk_size):
+                if fields: chunk = [dict(zip(fields, x)) for x in chunk]
+                h.write(''.join(
+                    json.dumps(x, ensure_ascii=False) + '\n' for x in chunk
+                ))
+                i += len(chunk)
+        else:
+            raise ValueError('unsupported format {}'.format(fmt))
+    return i
@@ -0,0 +1,223 @@
+"""
+Columnar Name Table for Python
+
+Bulk, column-wise handling of many personal names at once, for use
+with the Personal Name Toolkit reference implementation
+
+"""
+# Copyright 2023 by Moses Chong
+#
+# This program is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# This module uses spaces, not tabs
+
+from array import array
+from itertools import repeat, zip_longest
+from personalname import PersonalName, compile_format, get_config
+
+class NameTable:
+    """
+    A table of personal names for extracting elements, alternate
+    names and formatted names from many names at once, without
+    creating a PersonalName for every name.
+
+    Example:
+    t = NameTable(
+        ['Victor Chang (vchang)', 'Inoue Daisuke'],
+        ['N1=1;NS=2', 'NS=1;N1=2']
+    )
+    t.get_main_name_element('NS') => ['Chang', 'Inoue']
+    t.get_formatted_name('{NS}, {N1}') => ['Chang, Victor', 'Inoue, Daisuke']
+    t.count_alt_names() => [1, 0]
+
+    All name strings are kept in a single string. The offsets of
+    each main name element and alternate name are worked out once,
+    when the table is created, and kept in arrays. Configurations
+    are shared between rows, please see personalname.get_config().
+
+    Batch methods return a list with one item for each row, in the
+    same order as the names were given.
+
+    """
+    OUT_DEFAULT = PersonalName.OUT_DEFAULT
+
+    def __init__(self, name_strs=(), config_strs=None):
+        """
+        Args
+        ----
+        * name_strs: a sequence or iterable of Name Strings
+
+        * config_strs: a sequence or iterable of Configuration
+          Strings, one for each name in name_strs. When not specified,
+          all names use the default configuration.
+
+        Raises ValueError if name_strs and config_strs are of different
+        lengths. Please see PersonalName for details on Name Strings
+        and Configuration Strings.
+
+        """
+        self._buf = ''                    # all name strings, joined
+        self._row_start = array('I', [0]) # offset of each row in _buf
+        self._row_config = array('I')     # index in _configs for each row
+        self._configs = []                # NameConfigs in use
+        self._el_row = array('I', [0])    # first element of each row
+        self._el_start = array('I')
+        self._el_end = array('I')
+        self._alt_row = array('I', [0])   # first alt name of each row
+        self._alt_start = array('I')
+        self._alt_end = array('I')
+        if config_strs is None:
+            self._build(zip(name_strs, repeat('')))
+        else:
+            self._build(zip_longest(name_strs, config_strs))
+
+    def _build(self, records):
+        config_ids = {}
+        names = []
+        bounds = []
+        for name_str, config_str in records:
+            if name_str is None:
+                raise ValueError('more config strings than names')
+            if config_str is None:
+                raise ValueError('more names than config strings')
+            config = get_config(config_str)
+            cid = config_ids.get(config)
+            if cid is None:
+                cid = config_ids[config] = len(self._configs)
+                self._configs.append(config)
+            names.append(name_str)
+            bounds.append(config.alt_list_bounds(name_str))
+            self._row_start.append(self._row_start[-1] + len(name_str))
+            self._row_config.append(cid)
+        # find elements in the joined string, so offsets are absolute
+        self._buf = buf = ''.join(names)
+        for r, (s, e) in enumerate(bounds):
+            config = self._configs[self._row_config[r]]
+            pos = self._row_start[r]
+            sp = config.main_name_spans(buf, pos, pos+s)
+            self._el_start.extend(sp[0::2])
+            self._el_end.extend(sp[1::2])
+            self._el_row.append(len(self._el_start))
+            sp = config.alt_name_spans(buf, pos+s, pos+e)
+            self._alt_start.extend(sp[0::2])
+            self._alt_end.extend(sp[1::2])
+            self._alt_row.append(len(self._alt_start))
+
+    def __len__(self):
+        return len(self._row_config)
+
+    def __getitem__(self, r):
+        """
+        Return the name in row r as a PersonalName
+        """
+        if r < 0: r += len(self)
+        if not 0 <= r < len(self): raise IndexError('row out of range')
+        name = self._buf[self._row_start[r]:self._row_start[r+1]]
+        return PersonalName(name, self._configs[self._row_config[r]].config_str)
+
+    def _indexes_by_config(self, key):
+        # index assigned to key by each config, in order of _configs
+        return [c.get(key, PersonalName.NOT_PRESENT) for c in self._configs]
+
+    def count_alt_names(self):
+        """
+        Return the number of alternate names of each name
+        """
+        a = self._alt_row
+        return [a[r+1] - a[r] for r in range(len(self))]
+
+    def count_main_name_elements(self):
+        """
+        Return the number of main name elements of each name
+        """
+        a = self._el_row
+        return [a[r+1] - a[r] for r in range(len(self))]
+
+    def get_alt_name(self, i=1):
+        """
+        Return an alternate name of each name by numeric index or
+        network name, like PersonalName.get_alt_name().
+
+        Names without a matching alternate name, including names
+        without any alternate names at all, get OUT_DEFAULT.
+
+        """
+        if issubclass(type(i), str):
+            # resolve network name to index
+            nn_fq = ''.join(
+                (PersonalName.NICKNAME_PREFIX, PersonalName.NICKNAME_NET_DELIM, i)
+            )
+            by_config = self._indexes_by_config(nn_fq)
+        elif i < 1: raise IndexError('first element is one')
+        else: by_config = None
+        out = [self.OUT_DEFAULT] * len(self)
+        buf = self._buf
+        rows = self._alt_row
+        starts = self._alt_start
+        ends = self._alt_end
+        for r in range(len(self)):
+            j = i if by_config is None else by_config[self._row_config[r]]
+            if not j or j < 1: continue
+            k = rows[r] + j - 1
+            if k < rows[r+1]: out[r] = buf[starts[k]:ends[k]]
+        return out
+
+    def get_formatted_name(self, fmt):
+        """
+        Return each name in a user-nominated format, according to a
+        format string. Please see PersonalName.get_formatted_name()
+        for the format code.
+
+        """
+        f = compile_format(fmt)
+        cols = {t: self.get_main_name_element(t) for t in set(f.tags)}
+        parts = list(f.parts)
+        subs = [(j, cols[parts[j]]) for j in range(1, len(parts), 2)]
+        out = []
+        for r in range(len(self)):
+            for j, col in subs: parts[j] = col[r]
+            out.append(''.join(parts))
+        return out
+
+    def get_main_name_element(self, i):
+        """
+        Return an element of the main name of each name, by type or by
+        numerical index, like PersonalName.get_main_name_element().
+
+        Names without a matching element get OUT_DEFAULT.
+
+        """
+        if issubclass(type(i), str):
+            if i == PersonalName.NICKNAME_PREFIX:
+                raise KeyError('{}: use get_alt_name for alternate names'.format(i))
+            if i not in PersonalName.INDEXES_MAIN_NAME:
+                raise KeyError('unsupported element')
+            by_config = self._indexes_by_config(i)
+        elif not i: raise IndexError('first element is one')
+        else: by_config = None
+        out = [self.OUT_DEFAULT] * len(self)
+        buf = self._buf
+        rows = self._el_row
+        starts = self._el_start
+        ends = self._el_end
+        tdicts = [c.tdict for c in self._configs]
+        for r in range(len(self)):
+            cid = self._row_config[r]
+            j = i if by_config is None else by_config[cid]
+            if not j: continue
+            k = rows[r] + j - 1 if j > 0 else rows[r+1] + j
+            if rows[r] <= k < rows[r+1]:
+                out[r] = buf[starts[k]:ends[k]].translate(tdicts[cid])
+        return out
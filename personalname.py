@@ -28,6 +28,17 @@ for object-oriented platforms
 #
 # This module uses spaces, not tabs
 
+import re
+from collections.abc import Mapping
+from functools import lru_cache
+from itertools import chain
+from weakref import WeakValueDictionary
+
+CONFIG_CACHE_SIZE = 1024 # max number of parsed config strings kept
+FORMAT_CACHE_SIZE = 256  # max number of compiled format strings kept
+CLI_CHUNK_SIZE = 10000   # lines written at a time by main()
+_RE_ELEMENT = re.compile(r'\S+') # same spaces as str.split() and str.isspace()
+
 class PersonalName:
     """
     The PersonalName Class for Python, for flexible handling of
@@ -35,7 +46,16 @@ class PersonalName:
     the Technical Documentaion for a more detailed explanation on
     usage and implementation.
 
+    Each name only keeps its name string, a reference to its shared
+    configuration and the bounds of its alternate name list. The
+    offsets of elements and alternate names are worked out on first
+    use. There is no per-instance __dict__.
+
     """
+    __slots__ = (
+        'name_string', '_config', '_i_alt_list_start', '_i_alt_list_end',
+        '_main_spans', '_alt_spans',
+    )
     CONFIG_SEP = '\u003b'     # ; semicolon
     CONFIG_KV_SEP = '\u003d'  # = equals
     CONFIG_DEFAULT = { # configurables and their default values
@@ -152,12 +172,12 @@ class PersonalName:
         self.name_string = name_str   # in Unicode
         #
         # Configuration
-        self._config = {}
-        self._tdict: dict
-        self._tdict_in: dict
+        self._config = None     # shared NameConfig, see get_config()
         self._i_alt_list_start = len(self.name_string)
         self._i_alt_list_end = self._i_alt_list_start
-        self._set_config(self.parse_config(config_str))
+        self._main_spans = None  # element offsets, see _main_name_spans()
+        self._alt_spans = None   # alt name offsets, see _alt_name_spans()
+        self._set_config(get_config(config_str))
 
     def __repr__(self):
         out = ''
@@ -167,49 +187,66 @@ class PersonalName:
             self.get_config_str() or "''"
         )
 
+    def _main_name_spans(self):
+        """
+        Return the offsets of the main name elements in name_string as
+        a flat tuple of (start_1, end_1, ..., start_n, end_n).
+
+        The name is only split on first use; the offsets are kept
+        until the configuration is changed.
+
+        """
+        if self._main_spans is None:
+            self._main_spans = self._config.main_name_spans(
+                self.name_string, 0, self._i_alt_list_start
+            )
+        return self._main_spans
+
+    def _alt_name_spans(self):
+        """
+        Return the offsets of the alternate names in name_string as a
+        flat tuple like _main_name_spans().
+
+        """
+        if self._alt_spans is None:
+            self._alt_spans = self._config.alt_name_spans(
+                self.name_string, self._i_alt_list_start, self._i_alt_list_end
+            )
+        return self._alt_spans
+
     def _main_name_iter(self):
-        s = self._i_alt_list_start
-        return (x for x in self.name_string[:s].split() if not x.isspace())
+        sp = self._main_name_spans()
+        ns = self.name_string
+        return (ns[sp[j]:sp[j+1]] for j in range(0, len(sp), 2))
 
     def _alt_name_iter(self):
-        s = self._i_alt_list_start
-        e = self._i_alt_list_end
-        return (x for x in self.name_string[s+1:e].split(self._config['ALSE']) if x and not x.isspace())
+        sp = self._alt_name_spans()
+        ns = self.name_string
+        return (ns[sp[j]:sp[j+1]] for j in range(0, len(sp), 2))
 
-    def _set_config(self, config_dict):
+    def _set_config(self, config):
         """
-        Apply configuration settings from config_dict to the name's
-        configuration.
+        Apply configuration settings to the name's configuration.
+
+        config may be a NameConfig, which replaces the configuration
+        as-is, or a dict of settings like those from parse_config().
 
-        Supported settings that are not present config_dict will
+        Supported settings that are not present in a config dict will
         be left unchanged if already set, or set to defaults
         otherwise.
 
         Please see CONFIG_DEFAULT for defaults and supported settings.
 
         """
-        # set delimiters and separators
-        for k in self.CONFIG_DEFAULT:
-            if k in config_dict: self._config[k] = config_dict[k]
-            elif k in self._config: pass
-            else: self._config[k] = self.CONFIG_DEFAULT[k]
-        # set main name elements
-        for k in self.INDEXES_MAIN_NAME:
-            if k in config_dict: self._config[k] = config_dict[k]
-            elif k not in config_dict: self._config[k] = self.NOT_PRESENT
-            elif k in self._config: pass
-        # set nicknames
-        for n in (x for x in config_dict if x.startswith(self.NICKNAME_PREFIX)):
-            self._config[n] = config_dict[n]
-        self._tdict = {ord(self._config['MNSU']): self._config['MNSP']}
-        self._tdict_in = {ord(self._config['MNSP']): self._config['MNSU']}
+        if not isinstance(config, NameConfig):
+            config = NameConfig(config, self._config)
+        self._config = config
         if self._config['ALST'] in self.name_string:
-            self._i_alt_list_start = self.name_string.index(
-                self._config['ALST']
-            )
-            self._i_alt_list_end = self.name_string.index(
-                self._config['ALED'], self._i_alt_list_start
-            )
+            s, e = self._config.alt_list_bounds(self.name_string)
+            self._i_alt_list_start = s
+            self._i_alt_list_end = e
+        self._main_spans = None
+        self._alt_spans = None
 
     def get_config_str(self):
         """
@@ -219,49 +256,32 @@ class PersonalName:
 
         """
         # PROTIP: this method is public as it is a multi-lang test subject
-        out = ''
-        cv_fmt_L1 = "{}{}{}{}".format(
-            '{}', self.CONFIG_KV_SEP, '{}', self.CONFIG_SEP
-        )
-        # configuration
-        for k in self.CONFIG_DEFAULT.keys():
-            if self._config[k] != self.CONFIG_DEFAULT[k]:
-                out = ''.join((out, cv_fmt_L1.format(k, self._config[k])))
-        # main name element indices
-        for k in (x for x in self._config if x in self.INDEXES_MAIN_NAME):
-            if self._config[k]:
-                out = ''.join((out, cv_fmt_L1.format(k, self._config[k])))
-        # nicknames
-        it = (x for x in self._config if x.startswith(self.NICKNAME_PREFIX))
-        for k in it:
-            out = ''.join((out, cv_fmt_L1.format(k, self._config[k])))
-        return out[:-1]
+        return self._config.config_str
 
     def count_main_name_elements(self):
-        nit = self._main_name_iter()
-        i = 0
-        for x in nit: i += 1
-        return i
+        return len(self._main_name_spans()) // 2
 
     def count_alt_names(self):
-        nit = self._alt_name_iter()
-        i = 0
-        for x in nit: i += 1
-        return i
+        return len(self._alt_name_spans()) // 2
 
-    def parse_config(self, config_str):
+    @classmethod
+    def parse_config(cls, config_str):
         """
         Parse configuration string into a dict
 
         Please consult the Configuration String Specification in the
         Technical Documentation for details on the string format.
 
+        This method does not change the name's configuration. Names
+        are configured from the shared, cached configuration returned
+        by get_config().
+
         """
         # PROTIP: this method is public as it is a multi-lang test subject
         if not config_str: return {}
         out = {}
-        for opt in config_str.split(self.CONFIG_SEP):
-            k, v = opt.split(self.CONFIG_KV_SEP)
+        for opt in config_str.split(cls.CONFIG_SEP):
+            k, v = opt.split(cls.CONFIG_KV_SEP)
             if k in out:
                 raise KeyError("option {} already set".format(k))
             else:
@@ -273,8 +293,8 @@ class PersonalName:
                 if v == k: pass          # treat self-alias as literal
                 elif out[v] in out: pass # only one level of aliases allowed
                 else: out[k] = out[v]
-            if (k in self.INDEXES_MAIN_NAME
-                or k.startswith(self.NICKNAME_PREFIX)):
+            if (k in cls.INDEXES_MAIN_NAME
+                or k.startswith(cls.NICKNAME_PREFIX)):
                     try:
                         out[k] = int(out[k])
                     except ValueError:
@@ -302,31 +322,12 @@ class PersonalName:
 
         Malformed or unsupported tags will be passed on to the output.
 
+        Format strings are parsed once and cached, please see
+        compile_format() for details.
+
         """
         # TODO: support alternate names too?
-        out = ''
-        TOPEN = '\u007b'   # { ASCII left curly bracket
-        TCLOSE = '\u007d'  # } ASCII right curly bracket
-        i = 0
-        last_topen = 0
-        last_tclose = 0
-        try:
-            while i < len(fmt):
-                # consider everything between the next tag close,
-                # and the last tag open before it as the whole tag.
-                last_topen = fmt.index(TOPEN, last_tclose)
-                last_tclose = fmt.index(TCLOSE, last_topen)
-                last_topen = fmt.rfind(TOPEN, last_topen, last_tclose)
-                infix = fmt[last_topen:last_tclose+1]
-                el_type = infix[1:-1]
-                if el_type in self.INDEXES_MAIN_NAME:
-                    infix = self.get_main_name_element(el_type)
-                out = ''.join((out, fmt[i:last_topen], infix))
-                i = last_tclose + 1
-        except ValueError:
-            # no more substitutions
-            out = ''.join((out, fmt[i:]))
-        return out
+        return compile_format(fmt).apply(self)
 
     def get_main_name_element(self, i):
         """
@@ -355,8 +356,10 @@ class PersonalName:
                 if not i: return self.OUT_DEFAULT
             else: raise KeyError('unsupported element')
         if not i: raise IndexError('first element is one')
-        nit: iter
-        return self.get_main_name_elements_as_str(i, i)
+        sp = self._main_name_spans()
+        j = 2*(i-1) if i > 0 else len(sp) + 2*i
+        if j < 0 or j >= len(sp): return self.OUT_DEFAULT
+        return self.name_string[sp[j]:sp[j+1]].translate(self._config.tdict)
 
     def get_main_name_elements_as_str(self, s, e, sep=' '):
         """
@@ -383,35 +386,22 @@ class PersonalName:
         is an ASCII space (U+0020).
 
         """
-        out = ""
-        n = e-s
         # reject invalid start and end settings
         if s > e and e != -1: raise IndexError('start must come before end')
         elif (s < 1 and e >= 1) or (s >= 1 and e < 1) and e!= -1:
             raise IndexError('cannot use positive with negative indices')
         # get elements
-        try:
-            if s < 1:
-                mend = self._i_alt_list_start
-                nit = (x for x in reversed(self.name_string[:mend].split()) if not x.isspace())
-                for x in range(e+1, 0): next(nit) # skip
-                for x in range(n+1):
-                    out = ''.join((next(nit), sep, out))
-                out = out.rstrip()
-            else:
-                nit = self._main_name_iter()
-                for x in range(s-1): next(nit) # skip
-                if e == -1:
-                    for x in nit:
-                        out = ''.join((out, sep, x))
-                else:
-                    for x in range(n+1):
-                        out = ''.join((out, sep, next(nit)))
-                out = out.lstrip()
-        except StopIteration:
-            pass
-        finally:
-            return out.translate(self._tdict)
+        sp = self._main_name_spans()
+        n = len(sp) // 2
+        if s < 1:
+            end = n - max(-e-1, 0)
+            start = max(end-(e-s+1), 0)
+        else:
+            start = s-1
+            end = n if e == -1 else min(e, n)
+        ns = self.name_string
+        out = sep.join(ns[sp[2*j]:sp[2*j+1]] for j in range(start, end))
+        return out.translate(self._config.tdict)
 
     def get_main_name_element_type(self, el):
         """
@@ -429,20 +419,15 @@ class PersonalName:
         before the lookup.
 
         """
-        # This method is currently implemented as a slow linear search,
-        # but it has been deemed acceptable for now as the method is
-        # not expected to be frequently used, and most names are not
-        # expected to have a large number of elements.
-        el = el.translate(self._tdict_in)
-        nit = self._main_name_iter()
+        # This method is currently implemented as a linear search over
+        # the element offsets, but it has been deemed acceptable for now
+        # as the method is not expected to be frequently used, and most
+        # names are not expected to have a large number of elements.
+        el = el.translate(self._config.tdict_in)
         i = 1
-        for e in nit:
+        for e in self._main_name_iter():
             if e == el:
-                out = ''
-                for k in self.INDEXES_MAIN_NAME:
-                    if k in self._config and self._config[k] == i:
-                        out = ''.join((out, k, self.CONFIG_SEP))
-                return out[:-1]
+                return self._config.element_types.get(i, '')
             i += 1
         raise ValueError('element {} not found in main name'.format(el))
 
@@ -473,22 +458,18 @@ class PersonalName:
         elif self._i_alt_list_start == len(self.name_string):
             raise IndexError('no alternate names found')
         elif i < 1: raise IndexError('first element is one')
-        s = self._i_alt_list_start
-        e = self._i_alt_list_end
-        try:
-            anit = self._alt_name_iter()
-            for x in range(i-1):
-                next(anit)
-            return next(anit).strip()
-        except StopIteration:   # end of names reached
+        sp = self._alt_name_spans()
+        j = 2*(i-1)
+        if j < 0 or j >= len(sp):   # end of names reached
             return self.OUT_DEFAULT
+        return self.name_string[sp[j]:sp[j+1]]
 
     def get_main_name(self):
         """
         Return the main name in a presentation-ready form with spaces
         """
         i = self._i_alt_list_start
-        return self.name_string[:i].strip().translate(self._tdict)
+        return self.name_string[:i].strip().translate(self._config.tdict)
 
     def get_main_name_nosp(self):
         """
@@ -499,5 +480,472 @@ class PersonalName:
         names are written without spaces.
 
         """
-        td = {ord(self._config['MNSP']): None}
-        return self.get_main_name().translate(td)
+        return self.get_main_name().translate(self._config.tdict_nosp)
+
+
+class NameConfig(Mapping):
+    """
+    An immutable, parsed PersonalName configuration. All names with
+    the same configuration string share a single NameConfig, please
+    see get_config().
+
+    NameConfig behaves like a read-only dict of all supported options:
+    the delimiters in CONFIG_DEFAULT, the element type indexes in
+    INDEXES_MAIN_NAME (NOT_PRESENT when not set), and nickname indexes.
+
+    c = get_config('NS=1;N1=2;NN:example.com=1')
+    c['NS'] => 1
+    c['FN'] => None
+    c['ALSE'] => ','
+    c['NN:example.com'] => 1
+    c.config_str => 'N1=2;NS=1;NN:example.com=1'
+
+    The str.translate() tables for converting space substitutes are
+    worked out once and shared between configurations with the same
+    space and space substitute.
+
+    """
+    __slots__ = (
+        '_items', '_hash', '_networks', 'config_str', 'element_types',
+        'tdict', 'tdict_in', 'tdict_nosp', '__weakref__'
+    )
+
+    def __init__(self, config_dict=None, base=None):
+        """
+        Build a configuration from config_dict, a dict of settings like
+        those returned by PersonalName.parse_config().
+
+        When base is another NameConfig, its delimiters and nicknames
+        are kept unless overridden by config_dict. Element indexes
+        are never kept from base.
+
+        """
+        config_dict = config_dict or {}
+        pn = PersonalName
+        items = {}
+        # set delimiters and separators
+        for k in pn.CONFIG_DEFAULT:
+            if k in config_dict: items[k] = config_dict[k]
+            elif base is not None: items[k] = base[k]
+            else: items[k] = pn.CONFIG_DEFAULT[k]
+        # set main name elements
+        for k in pn.INDEXES_MAIN_NAME:
+            items[k] = config_dict.get(k, pn.NOT_PRESENT)
+        # set nicknames
+        if base is not None:
+            for n in (x for x in base if x.startswith(pn.NICKNAME_PREFIX)):
+                items[n] = base[n]
+        for n in (x for x in config_dict if x.startswith(pn.NICKNAME_PREFIX)):
+            items[n] = config_dict[n]
+        self._items = items
+        self._hash = hash(frozenset(items.items()))
+        self.tdict, self.tdict_in, self.tdict_nosp = _translate_tables(
+            items['MNSP'], items['MNSU']
+        )
+        # element index to types lookup for get_main_name_element_type()
+        types = {}
+        for k in pn.INDEXES_MAIN_NAME:
+            if items[k]:
+                types.setdefault(items[k], []).append(k)
+        self.element_types = {i: pn.CONFIG_SEP.join(types[i]) for i in types}
+        # nickname networks and alt name indexes for networks()
+        pfx = pn.NICKNAME_PREFIX + pn.NICKNAME_NET_DELIM
+        self._networks = tuple(
+            (k[len(pfx):], items[k]) for k in sorted(items) if k.startswith(pfx)
+        )
+        self.config_str = self._dump()
+
+    def __repr__(self):
+        return "{}({!r})".format(self.__class__.__name__, self.config_str)
+
+    def __getitem__(self, k):
+        return self._items[k]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, k):
+        return k in self._items
+
+    def __eq__(self, other):
+        if isinstance(other, NameConfig):
+            return self._items == other._items
+        return super().__eq__(other)
+
+    def __hash__(self):
+        return self._hash
+
+    def get(self, k, default=None):
+        return self._items.get(k, default)
+
+    def networks(self):
+        """
+        Return the nickname networks of this configuration with their
+        alternate name indexes, as a tuple of (network, index) pairs
+        in alphabetical order, like config_str.
+
+        get_config('N1=1;NN:example.com=1').networks() => (('example.com', 1),)
+
+        """
+        return self._networks
+
+    def alt_list_bounds(self, name_str):
+        """
+        Return the offsets of the alternate name list start and end
+        delimiters in name_str. If there is no alternate name list,
+        both offsets are len(name_str).
+
+        Raises ValueError if the list is not closed.
+
+        """
+        s = name_str.find(self._items['ALST'])
+        if s < 0: return (len(name_str), len(name_str))
+        return (s, name_str.index(self._items['ALED'], s))
+
+    def main_name_spans(self, name_str, start, end):
+        """
+        Return the offsets of the main name elements in name_str
+        from start up to end, as a flat tuple of (start_1, end_1, ...,
+        start_n, end_n). For a single name, start is zero and end is
+        the alternate name list start.
+
+        """
+        it = _RE_ELEMENT.finditer(name_str, start, end)
+        return tuple(chain.from_iterable(m.span() for m in it))
+
+    def alt_name_spans(self, name_str, start, end):
+        """
+        Return the offsets of the alternate names in name_str between
+        the list delimiters at start and end, as a flat tuple like
+        main_name_spans(). Surrounding spaces are excluded, and
+        blank alternate names are skipped.
+
+        """
+        out = []
+        sep = self._items['ALSE']
+        i = start + 1
+        for x in name_str[start+1:end].split(sep):
+            xs = x.strip()
+            if xs:
+                j = i + x.index(xs)
+                out.extend((j, j + len(xs)))
+            i += len(x) + len(sep)
+        return tuple(out)
+
+    def _dump(self):
+        """
+        Get the shortest possible config_str required to reproduce
+        this configuration. Options that are not set or left at
+        defaults will not be included.
+
+        """
+        pn = PersonalName
+        out = []
+        cv_fmt_L1 = "{}{}{}".format('{}', pn.CONFIG_KV_SEP, '{}')
+        # configuration
+        for k in pn.CONFIG_DEFAULT:
+            if self._items[k] != pn.CONFIG_DEFAULT[k]:
+                out.append(cv_fmt_L1.format(k, self._items[k]))
+        # main name element indices
+        for k in pn.INDEXES_MAIN_NAME:
+            if self._items[k]:
+                out.append(cv_fmt_L1.format(k, self._items[k]))
+        # nicknames, in alphabetical order
+        it = (x for x in self._items if x.startswith(pn.NICKNAME_PREFIX))
+        for k in sorted(it):
+            out.append(cv_fmt_L1.format(k, self._items[k]))
+        return pn.CONFIG_SEP.join(out)
+
+
+_configs = WeakValueDictionary() # NameConfigs in use, by settings
+
+
+@lru_cache(maxsize=CONFIG_CACHE_SIZE)
+def get_config(config_str=''):
+    """
+    Return the shared NameConfig for the configuration string
+    config_str.
+
+    The most recently used configuration strings are cached, so that
+    repeated calls with the same string do not parse it again. The
+    number of cached strings is set by CONFIG_CACHE_SIZE.
+
+    Configuration strings that resolve to the same configuration,
+    such as 'NS=1;F1=NS' and 'NS=1;F1=1', share the same NameConfig
+    for as long as it is in use.
+
+    """
+    config = NameConfig(PersonalName.parse_config(config_str))
+    # configs are shared by their settings and not by config_str, as
+    # settings that do not survive dumping (e.g. an alias resolving to
+    # an int) may give the same config_str as a different config
+    return _configs.setdefault(frozenset(config.items()), config)
+
+
+@lru_cache(maxsize=64)
+def _translate_tables(mnsp, mnsu):
+    # tables for: space substitute to space, space to space
+    # substitute, and space removal
+    return ({ord(mnsu): mnsp}, {ord(mnsp): mnsu}, {ord(mnsp): None})
+
+
+class NameFormat:
+    """
+    A format string for get_formatted_name(), parsed into a sequence
+    of literal text and element tags, so that the same format may be
+    applied to many names without being scanned again.
+
+    Example:
+    f = compile_format("{NS}, {N1}")
+    f.apply(PersonalName('Inoue Daisuke', 'NS=1;N1=2')) => 'Inoue, Daisuke'
+    f.apply(PersonalName('Victor Chang', 'N1=1;NS=2')) => 'Chang, Victor'
+
+    The format code is the same as PersonalName.get_formatted_name().
+    Malformed or unsupported tags are kept as literal text.
+
+    The parsed format is kept in parts, a tuple of literal text and
+    element types in alternating order, beginning and ending with
+    literal text. The element types alone are kept in tags.
+
+    """
+    TOPEN = '\u007b'   # { ASCII left curly bracket
+    TCLOSE = '\u007d'  # } ASCII right curly bracket
+
+    def __init__(self, fmt):
+        self.fmt = fmt
+        parts = []  # literal text and element types, alternating
+        lit = []
+        i = 0
+        last_topen = 0
+        last_tclose = 0
+        try:
+            while i < len(fmt):
+                # consider everything between the next tag close,
+                # and the last tag open before it as the whole tag.
+                last_topen = fmt.index(self.TOPEN, last_tclose)
+                last_tclose = fmt.index(self.TCLOSE, last_topen)
+                last_topen = fmt.rfind(self.TOPEN, last_topen, last_tclose)
+                lit.append(fmt[i:last_topen])
+                el_type = fmt[last_topen+1:last_tclose]
+                if el_type in PersonalName.INDEXES_MAIN_NAME:
+                    parts.extend((''.join(lit), el_type))
+                    lit = []
+                else:
+                    lit.append(fmt[last_topen:last_tclose+1])
+                i = last_tclose + 1
+        except ValueError:
+            # no more substitutions
+            lit.append(fmt[i:])
+        parts.append(''.join(lit))
+        self.parts = tuple(parts)
+        self.tags = self.parts[1::2]
+
+    def __repr__(self):
+        return "{}({!r})".format(self.__class__.__name__, self.fmt)
+
+    def apply(self, name):
+        """
+        Return the name formatted according to this format.
+        name may be any object with a get_main_name_element()
+        method, such as a PersonalName.
+
+        """
+        return self.render(name.get_main_name_element)
+
+    def render(self, get_element):
+        """
+        Return a name formatted according to this format, with each
+        element looked up by calling get_element with its type, for
+        names that are not objects, such as records in a file.
+
+        f.render({'NS': 'Chang', 'N1': 'Victor'}.get) => 'Chang, Victor'
+
+        """
+        out = list(self.parts)
+        for j in range(1, len(out), 2):
+            out[j] = get_element(out[j])
+        return ''.join(out)
+
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def compile_format(fmt):
+    """
+    Return a NameFormat for the format string fmt.
+
+    The most recently used formats are cached, so that repeated
+    calls with the same format string do not parse it again.
+    The number of cached formats is set by FORMAT_CACHE_SIZE.
+
+    """
+    return NameFormat(fmt)
+
+
+# Command line interface
+#
+# Only the modules needed for the options given are imported, so
+# that short runs start quickly.
+
+def _cli_read(files, fmt):
+    # yield (name_str, config_str) records from files, - is stdin
+    import sys
+    for f in files or ('-',):
+        if fmt == 'lines':
+            h = sys.stdin if f == '-' else open(f, encoding='utf-8')
+            with h:
+                for line in h:
+                    line = line.rstrip('\r\n')
+                    if not line: continue
+                    name_str, _, config_str = line.partition('\t')
+                    yield (name_str, config_str)
+        else:
+            from namestream import read_chunks
+            for chunk in read_chunks(sys.stdin if f == '-' else f, fmt):
+                yield from chunk
+
+def _cli_error(row, err, errors):
+    # report a bad record; returns True if a blank line is to be output
+    import sys
+    sys.stderr.write('personalname: record {}: {}\n'.format(row, err))
+    if errors == 'strict': raise SystemExit(1)
+    return errors == 'blank'
+
+def _cli_lines(records, render, errors):
+    # output lines for records, one record at a time
+    for row, r in enumerate(records, 1):
+        try:
+            yield render(PersonalName(r[0], r[1]))
+        except Exception as x:
+            if _cli_error(row, x, errors): yield ''
+
+def _cli_batch_lines(records, fmt, types, workers, errors):
+    # output lines for records, using a pool of worker processes;
+    # bad names come back from the workers as exceptions
+    import namebatch
+    if fmt is not None:
+        out = namebatch.format_names(records, fmt, workers, catch=True)
+    else:
+        out = namebatch.extract_elements(records, types, workers, catch=True)
+    for row, x in enumerate(out, 1):
+        if isinstance(x, Exception):
+            if _cli_error(row, x, errors): yield ''
+        elif fmt is not None: yield x
+        else: yield '\t'.join(x)
+
+def main(argv=None):
+    """
+    Command line interface, for use in shell pipelines:
+
+    python -m personalname -f '{NS}, {N1}' names.txt
+    python -m personalname -e NS,N1 -i csv names.csv
+    python -m personalname -c < names.txt
+    python -m personalname --help
+
+    Reads names from files or standard input, and writes one line
+    for each name to standard output. Returns an exit status; a
+    SystemExit is raised for bad arguments, and for bad records when
+    the error policy is strict.
+
+    """
+    import sys
+    from argparse import ArgumentParser
+    p = ArgumentParser(
+        prog='python -m personalname',
+        description='Format, extract elements from, normalise or count '
+        'personal names, one output line per name.'
+    )
+    p.add_argument(
+        'files', nargs='*',
+        help='files to read, - for standard input (default)'
+    )
+    g = p.add_mutually_exclusive_group(required=True)
+    g.add_argument('-f', '--format', help='format string, e.g. "{NS}, {N1}"')
+    g.add_argument(
+        '-e', '--elements',
+        help='comma-separated element types or indexes, e.g. NS,N1 or 1,-1; '
+        'output is tab-separated'
+    )
+    g.add_argument(
+        '-c', '--config', action='store_true',
+        help='output each name string with its normalised config string'
+    )
+    g.add_argument(
+        '-n', '--counts', action='store_true',
+        help='output the number of main name elements and alternate names'
+    )
+    p.add_argument(
+        '-i', '--input-format', default='lines',
+        choices=('lines', 'csv', 'tsv', 'jsonl'),
+        help='lines: a name string, optionally followed by a tab and a '
+        'config string, on each line (default); csv, tsv, jsonl: '
+        'name_str and config_str columns or keys'
+    )
+    p.add_argument(
+        '-j', '--workers', type=int, default=1,
+        help='number of worker processes for -f and -e (default: 1)'
+    )
+    p.add_argument(
+        '--errors', default='strict', choices=('strict', 'skip', 'blank'),
+        help='on a bad record, stop (default), skip it, or output a blank '
+        'line; bad records are reported to standard error'
+    )
+    args = p.parse_args(argv)
+    types = None
+    if args.elements:
+        types = []
+        for t in args.elements.split(','):
+            if t in PersonalName.INDEXES_MAIN_NAME: types.append(t)
+            else:
+                try:
+                    types.append(int(t))
+                except ValueError:
+                    p.error('unsupported element {}'.format(t))
+                if types[-1] == 0:
+                    p.error('unsupported element 0, the first element is 1')
+    records = _cli_read(args.files, args.input_format)
+    if args.workers > 1 and (types or args.format):
+        lines = _cli_batch_lines(
+            records, args.format, tuple(types or ()), args.workers, args.errors
+        )
+    else:
+        if args.format:
+            f = compile_format(args.format)
+            render = f.apply
+        elif types:
+            render = lambda x: '\t'.join(x.get_main_name_element(t) for t in types)
+        elif args.config:
+            render = lambda x: '{}\t{}'.format(x.name_string, x.get_config_str())
+        else:
+            render = lambda x: '{}\t{}'.format(
+                x.count_main_name_elements(), x.count_alt_names()
+            )
+        lines = _cli_lines(records, render, args.errors)
+    out = sys.stdout
+    batch = []
+    try:
+        try:
+            for x in lines:
+                batch.append(x)
+                if len(batch) >= CLI_CHUNK_SIZE:
+                    out.write('\n'.join(batch) + '\n')
+                    batch = []
+        finally:
+            # lines made before a bad record are still output
+            if batch: out.write('\n'.join(batch) + '\n')
+        out.flush()
+    except BrokenPipeError:
+        # output closed early, e.g. by head; silence the error at exit
+        import os
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, out.fileno())
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    # run as the personalname module, so that the bulk use modules
+    # share the same classes and caches
+    import personalname
+    raise SystemExit(personalname.main())
@@ -1,11 +1,31 @@
+import asyncio
 import builtins
 import __main__
+import sys
+import tracemalloc
+import nameasync
+import namebatch
+import nameblock
+import namecheck
+import nameconfig
+import namederive
+import nameprof
+import namesort
+import namestats
+import namestore
+import namestream
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
 from json import JSONDecoder, decoder
-from os import scandir
-from personalname import PersonalName
-from unittest import TestCase
+from os import environ, path, scandir
+from nameindex import HandleDirectory, NameIndex
+from nametable import NameTable
+from personalname import PersonalName, get_config, main
+from tempfile import TemporaryDirectory
+from time import perf_counter_ns
+from unittest import TestCase, skipUnless
 
-classes = (PersonalName,)
+classes = (PersonalName, HandleDirectory, NameIndex, NameTable)
 exceptions = {
     'any': Exception,
     'arithmetic': ArithmeticError,
@@ -15,32 +35,621 @@ exceptions = {
     'value': ValueError,
 }
 jd = JSONDecoder()
+bench_mode = environ.get('IDMT_BENCH', '')
+
+def read_test_files(c):
+    """
+    Yield the path and decoded contents of each test file for c
+    """
+    tfiles = [f for f in scandir('tests/') if f.name.startswith(c.__name__) and f.name.endswith('.json')]
+    for f in tfiles:
+        with open(f.path, mode='r') as h:
+            try:
+                yield f.path, jd.decode(h.read())
+            except(decoder.JSONDecodeError) as jde:
+                jde.add_note("error in test file {}".format(f.path))
+                raise jde
+
+def scale_inputs(tspecs, scale):
+    """
+    Return copies of the init and args of a test, with strings named
+    in scale repeated as set in the perf spec (see SPECS-tests.rst)
+    """
+    inputs = {
+        'init': dict(tspecs.get('init', {})),
+        'args': dict(tspecs.get('args', {})),
+    }
+    for path, n in scale.items():
+        part, k = path.split('.', 1)
+        inputs[part][k] = ' '.join([inputs[part][k]] * n)
+    return inputs['init'], inputs['args']
 
 class data_defined_tests(TestCase):
     def test_all(self):
         for c in classes: 
             tdata: dict
-            tfiles = [f for f in scandir('tests/') if f.name.startswith(c.__name__) and f.name.endswith('.json')]
-            for f in tfiles:
-                with open(f.path, mode='r') as h:
-                    try:
-                        tdata = jd.decode(h.read())
-                        for test in tdata.get('tests', {}):
-                            with self.subTest(test=test,file=f.path):
-                                tspecs = tdata['tests'][test]
-                                obj = c(**tspecs.get('init', {}))
-                                fn = getattr(obj, tspecs['fn_name'])
-                                kwargs = tspecs.get('args', {})
-                                # TODO: multiple calls are not yet implemented
-                                if 'exception' in tspecs:
-                                    with self.assertRaises(
-                                        exceptions[tspecs['exception']]
-                                    ):
-                                        print(fn(**kwargs))
-                                else:
-                                    self.assertEqual(
-                                        fn(**kwargs), tspecs['out']
-                                    )
-                    except(decoder.JSONDecodeError) as jde:
-                        jde.add_note("error in test file {}".format(f.path))
-                        raise jde
+            for path, tdata in read_test_files(c):
+                for test in tdata.get('tests', {}):
+                    with self.subTest(test=test,file=path):
+                        tspecs = tdata['tests'][test]
+                        obj = c(**tspecs.get('init', {}))
+                        fn = getattr(obj, tspecs['fn_name'])
+                        kwargs = tspecs.get('args', {})
+                        # TODO: multiple calls are not yet implemented
+                        if 'exception' in tspecs:
+                            with self.assertRaises(
+                                exceptions[tspecs['exception']]
+                            ):
+                                print(fn(**kwargs))
+                        else:
+                            self.assertEqual(
+                                fn(**kwargs), tspecs['out']
+                            )
+
+    @skipUnless(bench_mode, 'set IDMT_BENCH=1 to run performance tests')
+    def test_perf(self):
+        for c in classes:
+            for path, tdata in read_test_files(c):
+                for test, tspecs in tdata.get('tests', {}).items():
+                    if 'perf' not in tspecs: continue
+                    with self.subTest(test=test,file=path):
+                        perf = tspecs['perf']
+                        init, kwargs = scale_inputs(tspecs, perf.get('scale', {}))
+                        fn = getattr(c(**init), tspecs['fn_name'])
+                        exc = exceptions.get(tspecs.get('exception'), ())
+                        def call():
+                            try: fn(**kwargs)
+                            except exc: pass
+                        call() # warm up
+                        iterations = perf.get('iterations', 1000)
+                        ns = None
+                        for x in range(perf.get('repeat', 3)):
+                            t = perf_counter_ns()
+                            for y in range(iterations): call()
+                            dt = (perf_counter_ns() - t) / iterations
+                            if ns is None or dt < ns: ns = dt
+                        tracemalloc.start()
+                        try:
+                            base = tracemalloc.get_traced_memory()[0]
+                            call()
+                            nbytes = tracemalloc.get_traced_memory()[1] - base
+                        finally:
+                            tracemalloc.stop()
+                        budget = perf.get('budget', {})
+                        over = [
+                            k for k, v in (('ns_per_call', ns), ('bytes_per_call', nbytes))
+                            if k in budget and v > budget[k]
+                        ]
+                        print("{}:{}: {:.0f} ns/call, {:.0f} calls/s, {} bytes/call{}".format(
+                            path, test, ns, 1e9 / ns, nbytes,
+                            ' OVER BUDGET: {}'.format(', '.join(over)) if over else ''
+                        ), file=sys.stderr)
+                        self.assertFalse(over, 'over budget')
+
+class get_config_tests(TestCase):
+    def test_same_config_str(self):
+        # 'F1=1;ALSE=F1' resolves ALSE to the int 1, and dumps to the
+        # same config_str as the literal ALSE of the second name
+        PersonalName('Moshe (x, y)', 'F1=1;ALSE=F1').get_config_str()
+        x = PersonalName('Victor Chang (vc1x)', 'ALSE=1;F1=1')
+        self.assertEqual(x.get_alt_name(2), 'x')
+        self.assertIs(get_config('F1=1;ALSE=1'), get_config('ALSE=1;F1=1'))
+
+class namestream_tests(TestCase):
+    def test_read_fields(self):
+        f = StringIO('name_str,config_str\r\nVictor Chang (vchang),N1=1;NS=2\r\n'
+            'Inoue Daisuke,NS=1;N1=2\r\nCher,\r\n')
+        out = list(namestream.read_fields(
+            f, ('N1', 'NS', '{NS}, {N1}'), fmt='csv', chunk_size=2
+        ))
+        self.assertEqual(out, [
+            ('Victor', 'Chang', 'Chang, Victor'),
+            ('Daisuke', 'Inoue', 'Inoue, Daisuke'),
+            ('', '', ', '),
+        ])
+
+    def test_write_read_jsonl(self):
+        f = StringIO()
+        rows = [('Inoue Daisuke', 'NS=1;N1=2'), ('Gauri Nanda (clocky)', '')]
+        fields = (namestream.NAME_FIELD, namestream.CONFIG_FIELD)
+        n = namestream.write_records(f, rows, fields, fmt='jsonl', chunk_size=1)
+        self.assertEqual(n, 2)
+        f.seek(0)
+        names = list(namestream.read_names(f, fmt='jsonl'))
+        self.assertEqual(
+            [x.get_main_name_element('N1') for x in names], ['Daisuke', '']
+        )
+        self.assertEqual(names[1].get_alt_name(), 'clocky')
+
+class namebatch_tests(TestCase):
+    records = [
+        ('Victor Chang (vchang)', 'N1=1;NS=2'),
+        ('Inoue Daisuke', 'NS=1;N1=2'),
+        ('Wu Ze_Tian', 'NS=1;N1=2'),
+    ] * 3
+
+    def test_format_names(self):
+        expected = [
+            PersonalName(n, c).get_formatted_name('{NS}, {N1}')
+            for n, c in self.records
+        ]
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                out = namebatch.format_names(
+                    self.records, '{NS}, {N1}', workers=workers, chunk_size=2
+                )
+                self.assertEqual(list(out), expected)
+
+    def test_extract_elements(self):
+        out = namebatch.extract_elements(
+            self.records[:3], ('N1', -1), workers=1
+        )
+        self.assertEqual(
+            list(out), [('Victor', 'Chang'), ('Daisuke', 'Daisuke'), ('Ze Tian', 'Ze Tian')]
+        )
+
+    def test_catch(self):
+        # the bad alternate name separator only fails when alternate
+        # names are split, as NameTable does
+        records = self.records[:2] + [
+            ('Victor Chang (vc)', 'N1=1;NS=2;ALSE='),
+            ('Victor Chang (vc', 'N1=1;NS=2'),
+        ]
+        with self.assertRaises(ValueError):
+            list(namebatch.format_names(records, '{N1}', workers=1))
+        for workers in (1, 2):
+            out = list(namebatch.format_names(
+                records, '{N1}', workers=workers, chunk_size=3, catch=True
+            ))
+            self.assertEqual(out[:3], ['Victor', 'Daisuke', 'Victor'])
+            self.assertIsInstance(out[3], ValueError)
+
+class nameasync_tests(TestCase):
+    def test_aformat_names(self):
+        records = [('Victor Chang', 'N1=1;NS=2'), ('Inoue Daisuke', 'NS=1;N1=2')]
+        async def source():
+            for x in records * 3: yield x
+        async def run(src):
+            out = []
+            async for x in nameasync.aformat_names(
+                src, '{NS}, {N1}', slice_size=2, offload_size=2
+            ):
+                out.append(x)
+            return out
+        expected = ['Chang, Victor', 'Inoue, Daisuke'] * 3
+        self.assertEqual(asyncio.run(run(source())), expected)
+        self.assertEqual(asyncio.run(run(records * 3)), expected)
+
+    def test_aextract_elements(self):
+        async def run():
+            return [x async for x in nameasync.aextract_elements(
+                [('Inoue Daisuke', 'NS=1;N1=2')], ('N1', 'NS')
+            )]
+        self.assertEqual(asyncio.run(run()), [('Daisuke', 'Inoue')])
+
+class nameindex_tests(TestCase):
+    def test_config_networks(self):
+        c = get_config('N1=1;NN:example.org=2;NS=2;NN:example.com=NS')
+        self.assertEqual(c.networks(), (('example.com', 2), ('example.org', 2)))
+        self.assertEqual(get_config('N1=1').networks(), ())
+
+    def test_add_remove(self):
+        x = NameIndex(types=('NS',))
+        names = ['Mac{}'.format(i) for i in range(200)]
+        ids = [x.add(('Angus {}'.format(n), 'N1=1;NS=2')) for n in names]
+        for i in ids[::2]: x.remove(i)
+        self.assertEqual(x.find_prefix('NS', 'Mac'), ids[1::2])
+        self.assertEqual(x.find_prefix('NS', 'Mac10'), [101, 103, 105, 107, 109])
+        x.add(('Angus Mac0', 'N1=1;NS=2'), rid=0)
+        x.add(('Angus Mac1', 'N1=1;NS=2'))
+        self.assertEqual(x.find('NS', 'Mac1'), [1, 200])
+        self.assertEqual(x.find_prefix('NS', 'Mac0'), [0])
+        x.add(('Angus Other', 'N1=1;NS=2'), rid=1)
+        self.assertEqual(x.find('NS', 'Mac1'), [200])
+        self.assertEqual(len(x), 102)
+
+    def test_handle_directory_add_remove(self):
+        d = HandleDirectory()
+        a = d.add(('Moshe Cohen (Goat Man, thegoat1)', 'N1=1;NS=2;NN:example.com=2'))
+        b = d.add(('Gauri Nanda (thegoat1)', 'N1=1;NS=2;NN:example.com=1'))
+        self.assertEqual(d.find('example.com', 'thegoat1'), [a, b])
+        d.remove(a)
+        self.assertEqual(d.find('example.com', 'thegoat1'), [b])
+        d.add(('Gauri Nanda (clocky)', 'N1=1;NS=2;NN:example.com=1'), rid=b)
+        self.assertEqual(d.find('example.com', 'thegoat1'), [])
+        self.assertEqual(d.handles('example.com'), ['clocky'])
+
+class nameblock_tests(TestCase):
+    records = [
+        ('Inoue Daisuke', 'NS=1;N1=2', 0),
+        ('Daisuke INOUE', 'N1=1;NS=2', 1),
+        ('Ｉｎｏｕｅ Dai', 'NS=1;N1=2', 2),
+        ('Inoue Akira', 'NS=1;N1=2', 3),
+        ('Victor Chang', 'N1=1;NS=2', 4),
+        ('Cher', '', 5),
+    ]
+
+    def test_make_key(self):
+        k = nameblock.make_key(('NS', 'N1:2'))
+        self.assertEqual(k(PersonalName(*self.records[2][:2])), ('inoue', 'da'))
+        self.assertIsNone(k(PersonalName('Cher')))
+        with self.assertRaises(KeyError): nameblock.make_key(('XX',))
+
+    def test_block_records(self):
+        for max_records in (100, 2):
+            with self.subTest(max_records=max_records):
+                out = nameblock.block_records(
+                    self.records, max_records=max_records, partitions=3
+                )
+                out = {k: sorted(x[2] for x in b) for k, b in out}
+                self.assertEqual(out, {('inoue', 'd'): [0, 1, 2]})
+
+class namestore_tests(TestCase):
+    records = [
+        ('Victor Chang (vchang, ahcheong)', 'N1=1;NS=2;NN:example.com=2'),
+        ('張 任謙 (阿張)', 'NS=1;N1=2'),
+        ('Muhammad ibn Abu_Bakr al-Khwarizmi', 'N1=1;FD=2;F1=3;NS=4'),
+        ('', ''),
+        ('Srinivasa Ramanujan', 'NS=1;F1=NS;N1=2'),
+    ]
+
+    def test_write_read(self):
+        with TemporaryDirectory() as tmp:
+            p = path.join(tmp, 'names.pns')
+            self.assertEqual(namestore.write_store(p, self.records), 5)
+            with namestore.NameStore(p) as s:
+                self.assertEqual(len(s), 5)
+                for n, (name_str, config_str) in enumerate(self.records):
+                    x = PersonalName(name_str, config_str)
+                    self.assertEqual(s.get_name_str(n), name_str)
+                    self.assertEqual(s.get_config_str(n), x.get_config_str())
+                    self.assertEqual(
+                        s.count_main_name_elements(n), x.count_main_name_elements()
+                    )
+                    self.assertEqual(s.count_alt_names(n), x.count_alt_names())
+                    for i in ('N1', 'NS', 'F1', 1, 3, -1, -2):
+                        self.assertEqual(
+                            s.get_main_name_element(n, i), x.get_main_name_element(i)
+                        )
+                    self.assertEqual(
+                        s.get_formatted_name(n, '{NS}, {N1}'),
+                        x.get_formatted_name('{NS}, {N1}')
+                    )
+                self.assertEqual(s.get_alt_name(0, 'example.com'), 'ahcheong')
+                self.assertEqual(s.get_alt_name(1), '阿張')
+                self.assertEqual(s.get_alt_name(2, 2), '')
+                self.assertEqual(repr(s[-1]), repr(PersonalName(*self.records[-1])))
+
+class nameprof_tests(TestCase):
+    def test_profiling(self):
+        orig = PersonalName.get_formatted_name
+        nameprof.reset()
+        with nameprof.profiling():
+            self.assertTrue(nameprof.is_enabled())
+            x = PersonalName('Victor Chang (vchang)', 'N1=1;NS=2')
+            x.get_formatted_name('{NS}, {N1}')
+            x.get_formatted_name(fmt='{N1}')
+            PersonalName.parse_config('N1=1')
+        self.assertFalse(nameprof.is_enabled())
+        self.assertIs(PersonalName.get_formatted_name, orig)
+        out = nameprof.snapshot()
+        self.assertEqual(out['get_formatted_name']['calls'], 2)
+        self.assertEqual(out['get_formatted_name']['sizes']['tags'], {1: 1, 2: 1})
+        self.assertEqual(out['get_main_name_element']['sizes']['elements'], {2: 3})
+        self.assertEqual(out['__init__']['calls'], 1)
+        self.assertEqual(out['parse_config']['calls'], 1)
+        self.assertIn('get_formatted_name n=2', nameprof.log_line())
+        nameprof.reset()
+        self.assertEqual(nameprof.snapshot(), {})
+
+class namesort_tests(TestCase):
+    records = [
+        ('victor Chang', 'N1=1;NS=2', 0),
+        ('Ramanujan', 'NS=1', 1),
+        ('張 任謙', 'NS=1;N1=2', 2),
+        ('Andre Chang', 'N1=1;NS=2', 3),
+        ('Victor chang', 'N1=1;NS=2', 4),
+    ]
+
+    def test_collation_key(self):
+        k = namesort.make_collation_key(('NS', 'N1'))
+        self.assertEqual(k(PersonalName('Victor Chang', 'N1=1;NS=2')), ('chang', 'victor'))
+        self.assertEqual(k(PersonalName('Ramanujan', 'NS=1')), ('ramanujan', ''))
+        k = namesort.make_collation_key(('NS', 'N1'), missing_last=True)
+        self.assertEqual(k(PersonalName('Ramanujan', 'NS=1'))[1], namesort.MISSING_LAST)
+        self.assertEqual(
+            namesort.collation_keys(self.records, ('NS', 'N1'), fold=False)[:2],
+            [('Chang', 'victor'), ('Ramanujan', '')]
+        )
+        with self.assertRaises(KeyError):
+            namesort.make_collation_key(('NS', 'XX'))
+
+    def test_sort_records(self):
+        expected = [3, 0, 4, 1, 2]
+        for run_size in (2, 5, 100):
+            out = namesort.sort_records(self.records, ('NS', 'N1'), run_size=run_size)
+            self.assertEqual([x[2] for x in out], expected)
+        out = namesort.sort_records(self.records, ('N1',), missing_last=True)
+        self.assertEqual([x[2] for x in out], [3, 0, 4, 2, 1])
+
+    def test_sort_many_runs(self):
+        from bench.corpus import make_names
+        records = make_names(6000)
+        try:
+            import resource
+            limits = resource.getrlimit(resource.RLIMIT_NOFILE)
+            resource.setrlimit(resource.RLIMIT_NOFILE, (64, limits[1]))
+        except (ImportError, ValueError):
+            limits = None
+        try:
+            out = list(namesort.sort_records(records, run_size=20))
+        finally:
+            if limits: resource.setrlimit(resource.RLIMIT_NOFILE, limits)
+        self.assertEqual(out, list(namesort.sort_records(records)))
+
+    def test_sort_file(self):
+        src = StringIO('name_str,config_str\nVictor Chang,N1=1;NS=2\nRamanujan,NS=1\n')
+        dst = StringIO()
+        self.assertEqual(namesort.sort_file(src, dst, fmt='csv', dst_fmt='csv'), 2)
+        self.assertEqual(
+            dst.getvalue().splitlines(),
+            ['name_str,config_str', 'Victor Chang,N1=1;NS=2', 'Ramanujan,NS=1']
+        )
+
+class namestats_tests(TestCase):
+    records = [
+        ('Victor Chang (vchang)', 'N1=1;NS=2;NN:example.com=1'),
+        ('Andre Chang (dre, andrec)', 'N1=1;NS=2;NN:example.com=1;NN:example.org=2'),
+        ('張 任謙', 'NS=1;N1=2'),
+        ('Ramanujan', 'NS=1'),
+        ('Srinivasa Ramanujan', 'NS=1;F1=NS;N1=2'),
+    ]
+
+    def test_exact(self):
+        s = namestats.NameStats(('NS', 'N1'))
+        self.assertEqual(s.update(self.records, chunk_size=2), 5)
+        self.assertEqual(s.most_common('NS', 1), [('Chang', 2)])
+        self.assertEqual(s.get('N1', '任謙'), 1)
+        self.assertEqual(s.get('N1', 'Ramanujan'), 1)
+        self.assertEqual(
+            sorted(s.most_common(namestats.NETWORKS)),
+            [('example.com', 2), ('example.org', 1)]
+        )
+        self.assertEqual(s.get(namestats.CONFIGS, 'N1=1;NS=2;NN:example.com=1'), 1)
+        self.assertEqual(s.get(namestats.CONFIGS, 'N1=2;NS=1;F1=1'), 1)
+        self.assertEqual(s.element_counts, {2: 4, 1: 1})
+        self.assertEqual(s.alt_name_counts, {0: 3, 1: 1, 2: 1})
+
+    def test_merge(self):
+        for approx in (False, True):
+            whole = namestats.NameStats(approx=approx, epsilon=0.01)
+            whole.update(self.records)
+            a = namestats.NameStats(approx=approx, epsilon=0.01)
+            a.update(self.records[:2])
+            b = namestats.NameStats(approx=approx, epsilon=0.01)
+            b.update(self.records[2:])
+            c = a + b
+            a += b
+            for x in (a, c):
+                self.assertEqual(x.count, 5)
+                self.assertEqual(dict(x.most_common('NS')), dict(whole.most_common('NS')))
+                self.assertEqual(x.element_counts, whole.element_counts)
+        with self.assertRaises(ValueError):
+            a.merge(namestats.NameStats())
+
+    def test_sketch(self):
+        s = namestats.FrequencySketch(epsilon=0.01, delta=0.01, top=3)
+        keys = ['k{}'.format(i % 50) for i in range(1000)] + ['hot'] * 500
+        s.update(keys)
+        self.assertEqual(s.total, 1500)
+        self.assertEqual(s.most_common(1)[0][0], 'hot')
+        self.assertEqual(len(s.most_common()), 3)
+        for k in ('hot', 'k0', 'k49'):
+            true = keys.count(k)
+            self.assertTrue(true <= s[k] <= true + 0.01 * s.total)
+
+class namecheck_tests(TestCase):
+    def test_check_row(self):
+        cases = (
+            ('Victor Chang (vchang)', 'N1=1;NS=2;NN:example.com=1', ()),
+            ('Srinivasa Ramanujan', 'NS=1;F1=NS;N1=2', ()),
+            ('Victor Chang', 'N1=1;N1=2', (namecheck.DUPLICATE_KEY,)),
+            ('Victor Chang', 'N1=1;NS', (namecheck.BAD_OPTION,)),
+            ('Victor Chang', 'N1=one', (namecheck.NOT_INTEGER,)),
+            ('Victor Chang', 'N1=1;NS=N1;F1=NS', (namecheck.ALIAS_DEPTH,)),
+            ('Victor Chang', 'N1=1;MNSU=', (namecheck.BAD_DELIMITER,)),
+            ('Victor Chang', 'N1=1;NS=3', (namecheck.INDEX_RANGE,)),
+            ('Victor Chang (vchang)', 'NN:example.com=2', (namecheck.INDEX_RANGE,)),
+            ('Victor Chang (vchang', 'N1=1', (namecheck.ALT_LIST_OPEN,)),
+            ('Victor Chang vchang)', 'N1=1', (namecheck.ALT_LIST_CLOSE,)),
+        )
+        for name_str, config_str, codes in cases:
+            out = namecheck.check_row(name_str, config_str, 7)
+            self.assertEqual(tuple(x.code for x in out), codes, config_str)
+            for x in out: self.assertEqual(x.row, 7)
+            if not codes:
+                PersonalName(name_str, config_str).get_formatted_name('{NS}')
+
+    def test_checker(self):
+        records = [
+            ('Victor Chang', 'N1=1;NS=2'),
+            ('Victor Chang (vchang', 'N1=1;NS=2'),
+            ('Victor Chang', 'N1=1;NS=2'),
+        ]
+        c = namecheck.NameChecker()
+        out = list(c.check(records, start=1))
+        self.assertEqual([(x.row, x.field) for x in out], [(2, 'name_str')])
+        self.assertEqual(len(c.clean), 1)
+        self.assertTrue(c.is_clean(*records[0]))
+        self.assertFalse(c.is_clean(*records[1]))
+        # known-clean records are not checked again
+        fp = namecheck.fingerprint(*records[1])
+        c = namecheck.NameChecker({fp})
+        self.assertEqual(list(c.check(records[1:2])), [])
+
+class cli_tests(TestCase):
+    lines = (
+        'Victor Chang (vchang)\tN1=1;NS=2;NN:example.com=1\n'
+        'Inoue Daisuke\tNS=1;N1=2\n'
+        'Victor Chang (vchang\tN1=1;NS=2\n'
+        'Srinivasa Ramanujan\tNS=1;F1=NS;N1=2\n'
+    )
+
+    def run_main(self, *args):
+        with TemporaryDirectory() as tmp:
+            p = path.join(tmp, 'names.txt')
+            with open(p, 'w', encoding='utf-8') as h: h.write(self.lines)
+            out = StringIO()
+            err = StringIO()
+            with redirect_stdout(out), redirect_stderr(err):
+                try:
+                    status = main(list(args) + [p])
+                except SystemExit as x:
+                    status = x.code
+            return status, out.getvalue().splitlines(), err.getvalue()
+
+    def test_modes(self):
+        status, out, err = self.run_main('-f', '{NS}, {N1}', '--errors', 'blank')
+        self.assertEqual(status, 0)
+        self.assertEqual(out, ['Chang, Victor', 'Inoue, Daisuke', '', 'Srinivasa, Ramanujan'])
+        self.assertIn('record 3', err)
+        status, out, err = self.run_main('-e', 'NS,-1', '--errors', 'skip')
+        self.assertEqual(out, ['Chang\tChang', 'Inoue\tDaisuke', 'Srinivasa\tRamanujan'])
+        status, out, err = self.run_main('-c', '--errors', 'skip')
+        self.assertEqual(out[1], 'Inoue Daisuke\tN1=2;NS=1')
+        self.assertEqual(out[2], 'Srinivasa Ramanujan\tN1=2;NS=1;F1=1')
+        status, out, err = self.run_main('-n', '--errors', 'skip')
+        self.assertEqual(out, ['2\t1', '2\t0', '2\t0'])
+
+    def test_errors(self):
+        status, out, err = self.run_main('-f', '{NS}')
+        self.assertEqual(status, 1)
+        self.assertEqual(out, ['Chang', 'Inoue'])
+        status, out, err = self.run_main('-e', 'XX')
+        self.assertEqual(status, 2)
+        status, out, err = self.run_main('-e', 'NS,0')
+        self.assertEqual(status, 2)
+        self.assertIn('first element is 1', err)
+
+    def test_workers(self):
+        status, out, err = self.run_main('-f', '{N1}', '-j', '2', '--errors', 'blank')
+        self.assertEqual(out, ['Victor', 'Daisuke', '', 'Ramanujan'])
+
+    def test_workers_same_output(self):
+        # input that namecheck reports, but PersonalName accepts
+        lines = self.lines
+        self.lines = (
+            'Victor Chang)\tN1=1;NS=2\n'
+            'Victor Chang (vc)\tN1=1;NS=2;ALSE=\n'
+            'Victor Chang\tN1=1;NS=N1;F1=NS\n'
+            'Victor Chang (vchang\tN1=1;NS=2\n'
+            'Victor Chang\tN1=1;N1=2\n'
+            'Inoue Daisuke\tNS=1;N1=2\n'
+        )
+        try:
+            for errors in ('strict', 'skip', 'blank'):
+                args = ('-f', '{NS}, {N1}', '--errors', errors)
+                serial = self.run_main('-j', '1', *args)
+                self.assertEqual(self.run_main('-j', '2', *args), serial)
+            self.assertEqual(serial[1][0], 'Chang), Victor')
+        finally:
+            self.lines = lines
+
+class nameconfig_tests(TestCase):
+    records = [
+        ('Srinivasa Ramanujan', 'NS=1;F1=NS;N1=2'),
+        ('Inoue Daisuke', 'NS=1;N1=2'),
+        ('Victor Chang (vchang, vc)', 'N1=1;NS=2;NN:example.org=2;NN:example.com=1'),
+        ('Katsushika Hokusai', 'N1=2;NS=1'),
+        ('Victor Chang (vchang, vc)', 'NN:example.com=1;NN:example.org=2;NS=2;N1=1'),
+        ('Ramanujan', ''),
+    ]
+
+    def test_dictionary(self):
+        d = nameconfig.ConfigDictionary()
+        out = list(d.encode(self.records))
+        self.assertEqual([x[1] for x in out], [0, 1, 2, 1, 2, 3])
+        self.assertEqual(len(d), 4)
+        self.assertEqual(d[0], 'N1=2;NS=1;F1=1')
+        self.assertEqual(d[2], 'N1=1;NS=2;NN:example.com=1;NN:example.org=2')
+        self.assertEqual(d.canonical('F1=NS;NS=1;N1=2'), d[0])
+        for (name_str, config_str), x in zip(self.records, d.decode(out)):
+            self.assertEqual(x, (name_str, PersonalName(name_str, config_str).get_config_str()))
+
+    def test_split_join(self):
+        for ext in ('csv', 'jsonl'):
+            with TemporaryDirectory() as tmp:
+                names = path.join(tmp, 'names.' + ext)
+                configs = path.join(tmp, 'configs.' + ext)
+                n, d = nameconfig.split_records(self.records, names, configs)
+                self.assertEqual((n, len(d)), (6, 4))
+                self.assertEqual(list(nameconfig.ConfigDictionary.read(configs)), list(d))
+                out = list(nameconfig.join_records(names, configs))
+                self.assertEqual(out, list(d.decode(d.encode(self.records))))
+
+class namederive_tests(TestCase):
+    def test_changes(self):
+        from namederive import DELETE, INSERT, UPDATE
+        d = namederive.DerivedColumns({
+            'display': '{N1} {NS}',
+            'nosp': PersonalName.get_main_name_nosp,
+        })
+        out = d.apply([
+            (INSERT, 1, 'Inoue Daisuke', 'NS=1;N1=2'),
+            (INSERT, 2, 'Victor Chang', 'N1=1;NS=2'),
+            (INSERT, 3, 'Soo Tsu_Hong (Lisa)', 'NS=1;N1=2'),
+        ])
+        self.assertEqual(out[1], {'display': 'Daisuke Inoue', 'nosp': 'InoueDaisuke'})
+        self.assertEqual(len(d), 3)
+        # no-op update, equivalent config
+        self.assertEqual(d.apply([(UPDATE, 2, 'Victor Chang', 'NS=2;N1=1')]), {})
+        # only changed values are returned
+        out = d.apply([(UPDATE, 2, 'Victor Chang (vc)', 'N1=1;NS=2'), (DELETE, 1)])
+        self.assertEqual(out, {1: None})
+        self.assertIsNone(d.get(1))
+        out = d.apply([(UPDATE, 2, 'Andre Chang', 'N1=1;NS=2')])
+        self.assertEqual(out, {2: {'display': 'Andre Chang', 'nosp': 'AndreChang'}})
+        with self.assertRaises(KeyError):
+            d.apply([(DELETE, 1)])
+
+    def test_bad_change(self):
+        from namederive import INSERT, UPDATE
+        d = namederive.DerivedColumns({'display': '{N1} {NS}'})
+        d.apply([(INSERT, 1, 'Victor Chang', 'N1=1;NS=2')])
+        batch = [
+            (UPDATE, 1, 'Andre Chang', 'N1=1;NS=2'),
+            (INSERT, 0, 'Bad (x', 'N1=1'),
+        ]
+        with self.assertRaises(ValueError):
+            d.apply(batch)
+        # nothing in the failed batch is applied
+        self.assertIsNone(d.get(0))
+        self.assertEqual(d.get(1), {'display': 'Victor Chang'})
+        self.assertEqual(len(d), 1)
+        out = d.apply(batch[:1])
+        self.assertEqual(out, {1: {'display': 'Andre Chang'}})
+        self.assertEqual(d.get(1), {'display': 'Andre Chang'})
+        # a column that fails is not added
+        with self.assertRaises(KeyError):
+            d.set_column('bad', lambda x: x.get_main_name_element('XX'))
+        self.assertEqual(d.get(1), {'display': 'Andre Chang'})
+
+    def test_columns_and_configs(self):
+        d = namederive.DerivedColumns({'display': '{N1} {NS}'})
+        d.apply([
+            (namederive.INSERT, 'a', 'Inoue Daisuke', 'NS=1;N1=2'),
+            (namederive.INSERT, 'b', 'Katsushika Hokusai', 'N1=2;NS=1'),
+            (namederive.INSERT, 'c', 'Victor Chang', 'N1=1;NS=2'),
+        ])
+        cid = d.configs.get_id('NS=1;N1=2')
+        self.assertEqual(d.rows_using(cid), ['a', 'b'])
+        out = d.set_config(cid, 'N1=1;NS=2')
+        self.assertEqual(sorted(out), ['a', 'b'])
+        self.assertEqual(d.get('a'), {'display': 'Inoue Daisuke'})
+        self.assertEqual(d.rows_using(d.configs.get_id('N1=1;NS=2')), ['a', 'b', 'c'])
+        self.assertEqual(d.set_column('display', '{N1} {NS}'), {})
+        out = d.set_column('sort', '{NS}, {N1}')
+        self.assertEqual(out['c'], {'sort': 'Chang, Victor'})
+        self.assertEqual(d.column('sort')['a'], 'Daisuke, Inoue')
+        d.remove_column('display')
+        self.assertEqual(d.get('c'), {'sort': 'Chang, Victor'})